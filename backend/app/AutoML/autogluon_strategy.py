@@ -1,16 +1,16 @@
-import json
 import logging
 import os
 import threading
+from collections import OrderedDict
 from typing import Any
 
 from fastapi import HTTPException
 
 from AutoML.automl import AutoMLStrategy
-from src.data.data_processing import convert_to_timeseries
-from src.data.data_processing import safely_prepare_timeseries_data
-from src.models.forecasting import make_timeseries_dataframe
-from sessions.utils import get_session_path
+from src.data.data_processing import build_static_features, frame_nbytes, safely_prepare_timeseries_data
+from src.data.data_preparation import build_timeseries_dataframe, frame_fingerprint
+from src.models.forecasting import forecast, make_timeseries_dataframe
+from sessions.utils import get_session_path, load_session_metadata, save_json_file, save_session_metadata
 from training.model import TrainingParameters
 from autogluon.timeseries import TimeSeriesPredictor
 from AutoML.locks import global_automl_lock
@@ -18,6 +18,129 @@ from AutoML.locks import global_automl_lock
 # Глобальный семафор для ограничения числа одновременных обучений AutoGluon
 autogluon_train_semaphore = threading.Semaphore(12)
 
+# Загруженные предикторы держим в памяти: повторный прогноз по той же сессии
+# не распаковывает модель с диска и не платит за холодный первый predict.
+# persist() держит в памяти все модели ансамбля, поэтому кэш ограничен и по объёму:
+# размер папки модели на диске — оценка того, сколько она займёт после persist()
+_PREDICTOR_CACHE_MAX_ITEMS = 4
+_PREDICTOR_CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024
+_predictor_cache = OrderedDict()
+_predictor_cache_bytes = 0
+_predictor_cache_lock = threading.Lock()
+
+
+def _directory_size(path: str) -> int:
+    """
+    Суммарный размер файлов в папке path (рекурсивно).
+    """
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.stat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def load_predictor(model_path: str) -> TimeSeriesPredictor:
+    """
+    Загружает TimeSeriesPredictor из model_path с кэшированием в памяти процесса.
+    Кэш сбрасывается, если файл predictor.pkl был перезаписан (повторное обучение).
+    Модели, не помещающиеся в бюджет кэша, загружаются без persist() и не кэшируются.
+    """
+    global _predictor_cache_bytes
+    predictor_file = os.path.join(model_path, "predictor.pkl")
+    # Один stat вместо exists + getmtime: и наличие файла, и его версия
+    try:
+        mtime = os.stat(predictor_file).st_mtime_ns
+    except FileNotFoundError:
+        mtime = None
+    key = (model_path, mtime)
+    with _predictor_cache_lock:
+        cached = _predictor_cache.get(key)
+        if cached is not None:
+            _predictor_cache.move_to_end(key)
+            logging.info(f"Модель взята из кэша: {model_path}")
+            return cached[0]
+
+    predictor = TimeSeriesPredictor.load(model_path)
+    logging.info(f"Модель успешно загружена из {model_path}")
+    nbytes = _directory_size(model_path)
+    if nbytes > _PREDICTOR_CACHE_MAX_BYTES:
+        logging.info(f"Модель {model_path} больше бюджета кэша ({nbytes} байт), не кэшируем")
+        return predictor
+    if hasattr(predictor, "persist"):
+        # Держим модели ансамбля загруженными, а не читаем их с диска на каждый predict
+        predictor.persist()
+
+    with _predictor_cache_lock:
+        for cached_key in [k for k in _predictor_cache if k[0] == model_path]:
+            _predictor_cache_bytes -= _predictor_cache.pop(cached_key)[1]
+        _predictor_cache[key] = (predictor, nbytes)
+        _predictor_cache_bytes += nbytes
+        while (len(_predictor_cache) > _PREDICTOR_CACHE_MAX_ITEMS
+               or _predictor_cache_bytes > _PREDICTOR_CACHE_MAX_BYTES):
+            _predictor_cache_bytes -= _predictor_cache.popitem(last=False)[1][1]
+    return predictor
+
+# Прогнозы по модели и данным. Ключ — (папка модели, mtime predictor.pkl, отпечаток ts_df
+# вместе со статическими признаками): переобучение или другие данные дают промах,
+# а сами предиктор и ts_df в записи не хранятся и не удерживаются в памяти.
+_FORECAST_CACHE_MAX_ITEMS = 4
+_FORECAST_CACHE_MAX_BYTES = 256 * 1024 * 1024
+_forecast_cache = OrderedDict()
+_forecast_cache_bytes = 0
+_forecast_cache_lock = threading.Lock()
+
+
+def _predictor_version(model_path: str):
+    """
+    mtime_ns файла predictor.pkl (None, если файла нет) — меняется при переобучении.
+    """
+    try:
+        return os.stat(os.path.join(model_path, "predictor.pkl")).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def cached_forecast(model_path: str, predictor: TimeSeriesPredictor, ts_df):
+    """
+    forecast() с кэшированием результата для той же модели и тех же данных.
+    Возвращает копию, чтобы вызывающий код мог менять прогноз на месте.
+    """
+    global _forecast_cache_bytes
+    key = (
+        model_path,
+        _predictor_version(model_path),
+        frame_fingerprint(ts_df),
+        frame_fingerprint(getattr(ts_df, "static_features", None)),
+    )
+    with _forecast_cache_lock:
+        cached = _forecast_cache.get(key)
+        if cached is not None:
+            _forecast_cache.move_to_end(key)
+            logging.info(f"Прогноз взят из кэша: {model_path}")
+            return cached[0].copy()
+
+    preds = forecast(predictor, ts_df)
+
+    nbytes = frame_nbytes(preds)
+    with _forecast_cache_lock:
+        # Прогнозы прежних версий модели больше не понадобятся
+        for cached_key in [k for k in _forecast_cache if k[0] == model_path and k[1] != key[1]]:
+            _forecast_cache_bytes -= _forecast_cache.pop(cached_key)[1]
+        old = _forecast_cache.pop(key, None)
+        if old is not None:
+            _forecast_cache_bytes -= old[1]
+        if nbytes <= _FORECAST_CACHE_MAX_BYTES:
+            _forecast_cache[key] = (preds, nbytes)
+            _forecast_cache_bytes += nbytes
+        while len(_forecast_cache) > _FORECAST_CACHE_MAX_ITEMS or _forecast_cache_bytes > _FORECAST_CACHE_MAX_BYTES:
+            _forecast_cache_bytes -= _forecast_cache.popitem(last=False)[1][1]
+    return preds.copy()
+
+
 class AutoGluonStrategy(AutoMLStrategy):
     name = 'autogluon'
     def train(self,
@@ -32,7 +155,6 @@ class AutoGluonStrategy(AutoMLStrategy):
             try:
                 meta = None
                 try:
-                    from sessions.utils import load_session_metadata, save_session_metadata
                     meta = load_session_metadata(session_id)
                 except Exception:
                     pass
@@ -73,13 +195,10 @@ class AutoGluonStrategy(AutoMLStrategy):
                             logging.warning(f"[AutoGluonStrategy train] Не удалось записать pycaret_locked=False в metadata.json: {e}")
                 # --- Обучение модели AutoGluon под read lock ---
                 # Handle static features
-                static_df = None
-                if training_params.static_feature_columns:
-                    tmp = ts_df[[training_params.item_id_column] + training_params.static_feature_columns].drop_duplicates(
-                        subset=[training_params.item_id_column]
-                    ).copy()
-                    tmp.rename(columns={training_params.item_id_column: "item_id"}, inplace=True)
-                    static_df = tmp
+                static_df = build_static_features(
+                    ts_df, training_params.item_id_column, training_params.static_feature_columns
+                )
+                if static_df is not None:
                     logging.info(f"[train_model] Добавлены статические признаки: {training_params.static_feature_columns}")
 
                 # Convert to TimeSeriesDataFrame
@@ -166,13 +285,12 @@ class AutoGluonStrategy(AutoMLStrategy):
                 weighted_ensemble_model = predictor._trainer.load_model("WeightedEnsemble")
                 model_to_weight = getattr(weighted_ensemble_model, "model_to_weight", None)
                 if model_to_weight is not None:
-                    print(model_to_weight)
+                    logging.debug("[train_model] Веса WeightedEnsemble: %s", model_to_weight)
                     model_metadata["weightedEnsemble"] = model_to_weight
             except Exception as e:
                 logging.warning(f"[train_model] Не удалось получить веса WeightedEnsemble: {e}")
 
-        with open(os.path.join(model_path, "model_metadata.json"), "w", encoding="utf-8") as f:
-            json.dump(model_metadata, f, indent=2)
+        save_json_file(os.path.join(model_path, "model_metadata.json"), model_metadata)
 
         logging.info(f"[train_model] Метаданные модели сохранены.")
     
@@ -185,17 +303,12 @@ class AutoGluonStrategy(AutoMLStrategy):
         dt_col = training_params.get("datetime_column")
         tgt_col = training_params.get("target_column")
         freq = training_params.get("frequency")
-        static_df = None
-        
 
-        if static_feats:
-            tmp = ts_df[[id_col] + static_feats].drop_duplicates(subset=[id_col]).copy()
-            tmp.rename(columns={id_col: "item_id"}, inplace=True)
-            static_df = tmp
+        static_df = build_static_features(ts_df, id_col, static_feats)
+        if static_df is not None:
             logging.info(f"Добавлены статические признаки: {static_feats}")
 
-        df_ready = convert_to_timeseries(ts_df, id_col, dt_col, tgt_col)
-        ts_df = make_timeseries_dataframe(df_ready, static_df=static_df)
+        ts_df = build_timeseries_dataframe(ts_df, id_col, dt_col, tgt_col, static_df=static_df)
         
 
         session_path = get_session_path(session_id)
@@ -204,16 +317,17 @@ class AutoGluonStrategy(AutoMLStrategy):
             logging.error(f"Папка с моделью не найдена: {model_path}")
             raise HTTPException(status_code=404, detail="Папка с моделью не найдена")
         try:
-            predictor = TimeSeriesPredictor.load(model_path)
-            logging.info(f"Модель успешно загружена из {model_path}")
+            predictor = load_predictor(model_path)
         except Exception as e:
             logging.error(f"Ошибка загрузки модели: {e}")
             raise HTTPException(status_code=500, detail=f"Ошибка загрузки модели: {e}")
         # 6. Прогноз
         try:
-            preds = predictor.predict(ts_df)
+            preds = cached_forecast(model_path, predictor, ts_df)
             logging.info(f"Прогноз успешно выполнен для session_id={session_id}")
-            # Переименование колонок или индексов item_id и timestamp
+            # Переименование колонок или индексов item_id и timestamp.
+            # cached_forecast отдаёт собственную копию прогноза, поэтому переименовываем
+            # на месте, без ещё двух копий всего датафрейма
             if hasattr(preds, 'rename'):
                 rename_dict = {}
                 if 'item_id' in getattr(preds, 'columns', []):
@@ -223,7 +337,7 @@ class AutoGluonStrategy(AutoMLStrategy):
                 if 'mean' in getattr(preds, 'columns', []):
                     rename_dict['mean'] = tgt_col
                 if rename_dict:
-                    preds = preds.rename(columns=rename_dict)
+                    preds.rename(columns=rename_dict, inplace=True)
                 # Если item_id или timestamp в индексе
                 if hasattr(preds, 'index') and hasattr(preds.index, 'names'):
                     index_rename = {}
@@ -232,7 +346,7 @@ class AutoGluonStrategy(AutoMLStrategy):
                     if 'timestamp' in preds.index.names:
                         index_rename['timestamp'] = dt_col
                     if index_rename:
-                        preds = preds.rename_axis(index=index_rename)
+                        preds.rename_axis(index=index_rename, inplace=True)
         except Exception as e:
             logging.error(f"Ошибка при прогнозировании: {e}")
             raise HTTPException(status_code=500, detail=f"Ошибка при прогнозировании: {e}")
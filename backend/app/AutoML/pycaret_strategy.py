@@ -1,11 +1,10 @@
-import json
 import logging
 import os
 import pandas as pd
 from typing import Any, Optional, List, Union
 from pycaret.time_series import setup, compare_models, finalize_model, save_model, load_model, predict_model, pull
 from fastapi import HTTPException
-from sessions.utils import get_session_path, load_session_metadata, save_session_metadata
+from sessions.utils import get_session_path, load_session_metadata, save_json_file, save_session_metadata
 from AutoML.automl import AutoMLStrategy
 from AutoML.locks import global_automl_lock
 import numpy as np # Для np.nanmean
@@ -40,7 +39,8 @@ class PyCaretStrategy(AutoMLStrategy):
             return
         use_all_models = pycaret_models == '*' or (isinstance(pycaret_models, str) and pycaret_models.strip() == '*')
 
-        ts_df[datetime_col] = pd.to_datetime(ts_df[datetime_col])
+        if not pd.api.types.is_datetime64_any_dtype(ts_df[datetime_col]):
+            ts_df[datetime_col] = pd.to_datetime(ts_df[datetime_col])
         for col in training_params.static_feature_columns + [item_id_col]:
             if col in ts_df.columns:
                 ts_df[col] = ts_df[col].astype('category')
@@ -90,8 +90,8 @@ class PyCaretStrategy(AutoMLStrategy):
                 logging.warning(f"[PyCaretStrategy train] Не удалось записать pycaret_locked=False в metadata.json: {e}")
         try:
             # ...весь блок работы с PyCaret теперь под write lock...
-            for unique_id in unique_ids:
-                id_df = ts_df[ts_df[item_id_col] == unique_id].copy()
+            # Одна группировка вместо фильтрации всего датафрейма на каждый ID
+            for unique_id, id_df in ts_df.groupby(item_id_col, sort=False, observed=True):
                 # Удаляем все неключевые колонки
                 id_df = id_df.drop(columns=drop_cols_all, errors='ignore')
                 id_df = id_df.set_index(datetime_col)
@@ -118,7 +118,7 @@ class PyCaretStrategy(AutoMLStrategy):
                 leaderboard_save_path = os.path.join(id_leaderboards_dir, f'leaderboard_{unique_id}.csv')
                 # Оставляем только нужные колонки
                 metric_col = eval_metric.upper()
-                leaderboard_to_save = leaderboard_df[[col for col in ['Model', metric_col] if col in leaderboard_df.columns]].copy()
+                leaderboard_to_save = leaderboard_df[[col for col in ['Model', metric_col] if col in leaderboard_df.columns]]
                 leaderboard_to_save.to_csv(leaderboard_save_path, index=False)
                 best_score = leaderboard_to_save[metric_col][0] if metric_col in leaderboard_to_save.columns and not leaderboard_to_save.empty else None
                 if best_score is not None:
@@ -179,8 +179,7 @@ class PyCaretStrategy(AutoMLStrategy):
         model_metadata = training_params.model_dump()
         metadata_path = os.path.join(model_dir_path, "model_metadata.json")
         try:
-            with open(metadata_path, "w", encoding="utf-8") as f:
-                json.dump(model_metadata, f, indent=2, default=str)
+            save_json_file(metadata_path, model_metadata)
             logging.info(f"[PyCaretStrategy save_data] Model metadata saved to: {metadata_path}")
         except Exception as e:
             logging.error(f"[PyCaretStrategy save_data] Error saving model_metadata.json: {e}")
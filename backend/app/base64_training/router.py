@@ -2,8 +2,6 @@ import base64
 import json
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-import pandas as pd
-from pandas import ExcelWriter
 import io
 import os
 import uuid
@@ -17,10 +15,10 @@ from sessions.utils import (
     create_session_directory,
     get_model_path,
     training_sessions,
-    get_session_path
+    get_session_path,
 )
-from prediction.router import predict_timeseries
-from AutoML.manager import automl_manager
+from prediction.router import build_prediction_report, predict_timeseries
+from utils.excel_reader import read_excel
 
 router = APIRouter()
 
@@ -87,134 +85,6 @@ def create_basic_prediction_file(session_id: str) -> bytes:
     with open(prediction_file_path, "rb") as f:
         return f.read()
 
-def create_enhanced_prediction_file(session_id: str) -> bytes:
-    """
-    Создаёт Excel файл с прогнозом и дополнительными листами с метаинформацией:
-    - Prediction: основной прогноз
-    - Leaderboard: результаты моделей
-    - TrainingParams: параметры обучения
-    - WeightedEnsemble: веса ансамбля
-    - Messages: сообщения из metadata
-    - PyCaret_Leaderboards: детальные результаты PyCaret
-    """
-    session_path = get_session_path(session_id)
-    
-    # Основной файл прогноза
-    prediction_file_path = os.path.join(session_path, f"prediction_{session_id}.xlsx")
-    if not os.path.exists(prediction_file_path):
-        raise FileNotFoundError(f"Файл прогноза не найден: {prediction_file_path}")
-    
-    # Читаем основной прогноз
-    try:
-        df_pred = pd.read_excel(prediction_file_path)
-    except Exception as e:
-        raise Exception(f"Ошибка чтения файла прогноза: {e}")
-
-    # Пути к дополнительным файлам
-    leaderboard_path = os.path.join(session_path, "leaderboard.csv")
-    metadata_path = os.path.join(session_path, "metadata.json")
-
-    # Читаем leaderboard
-    df_leaderboard = None
-    if os.path.exists(leaderboard_path):
-        try:
-            df_leaderboard = pd.read_csv(leaderboard_path)
-        except Exception as e:
-            logging.warning(f"Не удалось прочитать leaderboard: {e}")
-
-    # Читаем параметры обучения
-    params_dict = None
-    if os.path.exists(metadata_path):
-        try:
-            with open(metadata_path, "r", encoding="utf-8") as f:
-                metadata = json.load(f)
-            params_dict = metadata.get("training_parameters", {})
-        except Exception as e:
-            logging.warning(f"Не удалось прочитать параметры обучения: {e}")
-
-    # Читаем веса WeightedEnsemble
-    weights_dict = None
-    if 'autogluon' in [strategy.name for strategy in automl_manager.get_strategies()]:
-        autogluon_metadata = os.path.join(session_path, "autogluon", "model_metadata.json")
-        if os.path.exists(autogluon_metadata):
-            try:
-                with open(autogluon_metadata, "r", encoding="utf-8") as f:
-                    model_metadata = json.load(f)
-                weights_dict = model_metadata.get("weightedEnsemble", None)
-            except Exception as e:
-                logging.warning(f"Не удалось прочитать веса WeightedEnsemble: {e}")
-
-    # Читаем leaderboard PyCaret по каждому уникальному id
-    pycaret_leaderboards = []
-    pycaret_leaderboards_dir = os.path.join(session_path, 'pycaret', 'id_leaderboards')
-    if os.path.exists(pycaret_leaderboards_dir):
-        for fname in os.listdir(pycaret_leaderboards_dir):
-            if fname.startswith('leaderboard_') and fname.endswith('.csv'):
-                unique_id = fname[len('leaderboard_'):-4]
-                try:
-                    df_lb = pd.read_csv(os.path.join(pycaret_leaderboards_dir, fname))
-                    df_lb.insert(0, 'unique_id', unique_id)
-                    # Добавляем разделитель
-                    pycaret_leaderboards.append(pd.DataFrame({'unique_id': [f'--- {unique_id} ---'], **{col: [''] for col in df_lb.columns if col != 'unique_id'}}))
-                    pycaret_leaderboards.append(df_lb)
-                except Exception as e:
-                    logging.warning(f"Не удалось прочитать leaderboard для PyCaret id={unique_id}: {e}")
-
-    # Создаём многолистовой Excel файл
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-        # Лист 1 - Основной прогноз
-        df_pred.to_excel(writer, sheet_name="Prediction", index=False)
-        
-        # Лист 2 - Leaderboard
-        if df_leaderboard is not None:
-            df_leaderboard.to_excel(writer, sheet_name="Leaderboard", index=False)
-            # Подсветка лучшей модели зелёным
-            workbook = writer.book
-            worksheet = writer.sheets["Leaderboard"]
-            green_format = workbook.add_format({'bg_color': '#C6EFCE', 'font_color': '#006100'})
-            if not df_leaderboard.empty:
-                worksheet.set_row(1, None, green_format)
-        else:
-            pd.DataFrame({"info": ["Leaderboard not found"]}).to_excel(writer, sheet_name="Leaderboard", index=False)
-        
-        # Лист 3 - Параметры обучения
-        if params_dict is not None:
-            pd.DataFrame(list(params_dict.items()), columns=["Parameter", "Value"]).to_excel(writer, sheet_name="TrainingParams", index=False)
-        else:
-            pd.DataFrame({"info": ["Training parameters not found"]}).to_excel(writer, sheet_name="TrainingParams", index=False)
-        
-        # Лист 4 - Веса WeightedEnsemble
-        if weights_dict is not None and isinstance(weights_dict, dict) and len(weights_dict) > 0:
-            pd.DataFrame(list(weights_dict.items()), columns=["Model", "Weight"]).to_excel(writer, sheet_name="WeightedEnsemble", index=False)
-        else:
-            pd.DataFrame({"info": ["WeightedEnsemble weights not found"]}).to_excel(writer, sheet_name="WeightedEnsemble", index=False)
-        
-        # Лист 5 - Сообщения из metadata
-        messages = None
-        if os.path.exists(metadata_path):
-            try:
-                with open(metadata_path, "r", encoding="utf-8") as f:
-                    metadata = json.load(f)
-                messages = metadata.get("messages", None)
-            except Exception as e:
-                logging.warning(f"Не удалось прочитать messages из metadata.json: {e}")
-        
-        if messages and isinstance(messages, list) and len(messages) > 0:
-            pd.DataFrame({"messages": messages}).to_excel(writer, sheet_name="Messages", index=False)
-        else:
-            pd.DataFrame({"info": ["Messages not found"]}).to_excel(writer, sheet_name="Messages", index=False)
-        
-        # Лист 6 - PyCaret Leaderboards
-        if pycaret_leaderboards:
-            df_pycaret_all = pd.concat(pycaret_leaderboards, ignore_index=True)
-            df_pycaret_all.to_excel(writer, sheet_name="PyCaret_Leaderboards", index=False)
-        else:
-            pd.DataFrame({"info": ["PyCaret leaderboards not found"]}).to_excel(writer, sheet_name="PyCaret_Leaderboards", index=False)
-    
-    output.seek(0)
-    return output.getvalue()
-
 @router.post("/train_predict_base64/", response_model=TrainPredictResponse)
 async def train_predict_base64(request: TrainPredictRequest):
     """
@@ -258,7 +128,7 @@ async def train_predict_base64(request: TrainPredictRequest):
         
         # Загружаем данные для обучения
         try:
-            df_train = pd.read_excel(io.BytesIO(train_file_bytes))
+            df_train = read_excel(io.BytesIO(train_file_bytes))
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Ошибка чтения Excel файла: {str(e)}")
         
@@ -293,7 +163,7 @@ async def train_predict_base64(request: TrainPredictRequest):
         
         # Создаём расширенный файл с метаинформацией
         try:
-            enhanced_file_bytes = create_enhanced_prediction_file(session_id)
+            enhanced_file_bytes = await asyncio.to_thread(build_prediction_report, session_id)
             prediction_base64 = base64.b64encode(enhanced_file_bytes).decode('utf-8')
             filename = f"prediction_with_metadata_{session_id}.xlsx"
             logging.info(f"[train_predict_base64] Создан расширенный файл с метаинформацией для session_id={session_id}")
@@ -301,7 +171,7 @@ async def train_predict_base64(request: TrainPredictRequest):
             logging.warning(f"[train_predict_base64] Ошибка создания расширенного файла: {e}")
             # Fallback к обычному файлу прогноза
             try:
-                basic_file_bytes = create_basic_prediction_file(session_id)
+                basic_file_bytes = await asyncio.to_thread(create_basic_prediction_file, session_id)
                 prediction_base64 = base64.b64encode(basic_file_bytes).decode('utf-8')
                 filename = f"prediction_{session_id}.xlsx"
                 logging.info(f"[train_predict_base64] Использован базовый файл прогноза для session_id={session_id}")
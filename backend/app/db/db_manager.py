@@ -1,4 +1,6 @@
 import io
+import math
+import datetime
 import asyncpg
 import pandas as pd
 from contextlib import asynccontextmanager
@@ -11,9 +13,10 @@ def auto_convert_dates(df: pd.DataFrame) -> pd.DataFrame:
     """
     Автоматически приводит все object-столбцы к datetime, если все не-null значения успешно преобразуются.
     Всегда сохраняет как datetime (TIMESTAMP), не приводит к типу date.
-    Возвращает новый DataFrame (копия).
+    Возвращает новый DataFrame; исходный не меняется.
     """
-    df = df.copy()
+    # Колонки только заменяются целиком, поэтому данные копировать не нужно
+    df = df.copy(deep=False)
     for col in df.select_dtypes(include=['object']).columns:
         orig_notnull = df[col].notnull()
         converted = pd.to_datetime(df[col], errors='coerce')
@@ -147,7 +150,6 @@ async def create_table_from_df(df: pd.DataFrame, schema: str, table_name: str, u
                 sql_type = 'BOOLEAN'
             elif pd_type == 'object':
                 # Не определяем DATE, всегда TIMESTAMP для дат
-                import datetime
                 non_null = df[col].dropna()
                 if not non_null.empty and all(isinstance(x, datetime.datetime) for x in non_null):
                     sql_type = 'TIMESTAMP'
@@ -213,7 +215,6 @@ async def upload_df_to_db(
     первичный ключ таблицы и выполнить "upsert" (INSERT ON CONFLICT UPDATE).
     """
     def convert_dates_for_db(val, dtype=None):
-        import datetime
         if dtype == 'datetime64[ns]':
             # asyncpg ожидает datetime.datetime для TIMESTAMP
             if isinstance(val, datetime.datetime):
@@ -279,7 +280,6 @@ async def upload_df_to_db(
 
 def clean_value(val):
         try:
-            import math
             if val is None:
                 return None
             if isinstance(val, float) and (math.isnan(val) or math.isinf(val)):
@@ -1,4 +1,5 @@
 import io
+import asyncio
 import pandas as pd
 from datetime import timedelta
 import os
@@ -24,6 +25,8 @@ from .db_manager import (
     auto_convert_dates
 )
 import logging
+from utils.excel_reader import read_excel
+from utils.excel_writer import write_excel
 
 router = APIRouter()
 
@@ -146,9 +149,10 @@ async def upload_excel_to_db_endpoint(
 
         content = await file.read()
         try:
-            df = pd.read_excel(io.BytesIO(content))
+            df = read_excel(io.BytesIO(content))
             df = auto_convert_dates(df)
-            print(df.dtypes)
+            # Диагностика форматируется только при включённом DEBUG
+            logging.debug("[upload_excel_to_db] Типы колонок:\n%s", df.dtypes)
         except Exception as e:
             raise HTTPException(status_code=400, detail=f'Ошибка чтения Excel: {str(e)}')
         if df.empty:
@@ -206,7 +210,7 @@ async def download_table_from_db_endpoint(
             raise HTTPException(status_code=404, detail=f"Таблица '{table_name}' пуста или не найдена")
         df = pd.DataFrame(result)
         output = io.BytesIO()
-        df.to_excel(output, index=False)
+        await asyncio.to_thread(write_excel, df, output, index=False)
         output.seek(0)
         logging.info(f"[download-table-from-db] Таблица '{table_name}' успешно выгружена в Excel.")
         return StreamingResponse(
@@ -242,7 +246,7 @@ async def save_prediction_to_db(
     if not os.path.exists(pred_path):
         raise HTTPException(status_code=404, detail=f"Файл прогноза не найден: {pred_path}")
     try:
-        df = pd.read_excel(pred_path)
+        df = read_excel(pred_path)
         df = auto_convert_dates(df)
         drop_cols = [str(round(x/10, 1)) for x in range(1, 10)]
         df = df.drop(columns=[col for col in drop_cols if col in df.columns], errors='ignore')
@@ -283,7 +287,7 @@ async def create_table_from_file_endpoint(
             raise HTTPException(status_code=400, detail='Файл должен быть Excel (.xlsx или .xls)')
         content = await file.read()
         try:
-            df = pd.read_excel(io.BytesIO(content))
+            df = read_excel(io.BytesIO(content))
             df = auto_convert_dates(df)
         except Exception as e:
             raise HTTPException(status_code=400, detail=f'Ошибка чтения Excel: {str(e)}')
@@ -330,16 +334,15 @@ async def check_df_matches_table_schema_endpoint(
             raise HTTPException(status_code=400, detail='Файл должен быть Excel (.xlsx или .xls)')
         content = await file.read()
         try:
-            df = pd.read_excel(io.BytesIO(content))
+            df = read_excel(io.BytesIO(content))
             df = auto_convert_dates(df)
             # Приводим столбец Date к типу datetime
-            if 'Date' in df.columns:
+            if 'Date' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['Date']):
                 df['Date'] = pd.to_datetime(df['Date'], errors='raise')
         except Exception as e:
             raise HTTPException(status_code=400, detail=f'Ошибка чтения Excel: {str(e)}')
         if df.empty:
             raise HTTPException(status_code=400, detail='Файл пустой или не содержит данных')
-        df = auto_convert_dates(df)
         matches = await check_df_matches_table_schema(df, schema, table_name, db_creds['username'], db_creds['password'])
         if matches:
             return {"success": True, "detail": "Структура совпадает"}
@@ -10,6 +10,7 @@ import asyncio
 from fastapi import Request
 from io import BytesIO
 from openpyxl import load_workbook
+from utils.excel_reader import read_excel
 
 
 
@@ -29,7 +30,7 @@ async def preview_excel(file: UploadFile = File(...)):
             # Читаем файл в память
             file_bytes = await file.read()
             excel_io = BytesIO(file_bytes)
-            df = pd.read_excel(excel_io, nrows=10)
+            df = read_excel(excel_io, nrows=10)
             excel_io.seek(0)
             wb = load_workbook(excel_io, read_only=True)
             ws = wb.active
@@ -81,13 +82,16 @@ async def get_timeseries_by_id(req: TimeSeriesRequest):
 async def analyze_dataframe(df):
     df = df.astype(str)
     columns = list(df.columns)
-    rows = df.values.tolist()
+    # В ответ уходят только первые 10 строк — не разворачиваем в списки весь датафрейм
+    rows = df.head(10).values.tolist()
     total = len(df)
     total_cells = df.size
-    missing_cells = int(
-        df.isnull().values.sum() +
-        sum((df[col] == '').sum() for col in df.columns if df[col].dtype == object)
-    )
+    # Пропуски по строкам считаем один раз: и общий итог, и корзины ниже — суммы по срезам
+    object_cols = [col for col in df.columns if df[col].dtype == object]
+    row_missing = df.isnull().sum(axis=1).to_numpy()
+    if object_cols:
+        row_missing = row_missing + (df[object_cols] == '').sum(axis=1).to_numpy()
+    missing_cells = int(row_missing.sum())
     percent = (missing_cells / total_cells) * 100 if total_cells else 0
     date_idx = next((i for i, col in enumerate(columns) if any(x in col.lower() for x in ['date', 'время', 'time'])), -1)
     bin_count = 12
@@ -97,10 +101,7 @@ async def analyze_dataframe(df):
         start = i * bin_size
         end = min((i + 1) * bin_size, total)
         bin_rows = df.iloc[start:end]
-        bin_missing = int(
-            bin_rows.isnull().values.sum() +
-            sum((bin_rows[col] == '').sum() for col in bin_rows.columns if bin_rows[col].dtype == object)
-        )
+        bin_missing = int(row_missing[start:end].sum())
         name = str(i + 1)
         if date_idx != -1 and not bin_rows.empty:
             first = str(bin_rows.iloc[0, date_idx])[:10]
@@ -109,7 +110,7 @@ async def analyze_dataframe(df):
         bins.append({"name": name, "missing": bin_missing, "total": len(bin_rows)})
     return {
         "columns": columns,
-        "rows": rows[:10],
+        "rows": rows,
         "total": total,
         "missing": missing_cells,
         "percent": percent,
@@ -135,7 +136,7 @@ async def analyze_data(
                 if filename.endswith('.csv'):
                     return pd.read_csv(file.file)
                 else:
-                    return pd.read_excel(file.file)
+                    return read_excel(file.file)
             else:
                 raise HTTPException(status_code=400, detail="Не передан файл или session_id")
         # Чтение и анализ в отдельном потоке
@@ -1,25 +1,127 @@
-import json
 from fastapi import APIRouter, HTTPException, Response
 import os
 import pandas as pd
 from io import BytesIO
 from typing import Dict
-from autogluon.timeseries import TimeSeriesPredictor
 from sessions.utils import (
     get_session_path,
     load_session_metadata,
+    load_json_file,
 )
 from src.features.feature_engineering import add_russian_holiday_feature, fill_missing_values
-from src.data.data_processing import convert_to_timeseries
+from src.data.data_processing import convert_to_timeseries, downcast_numeric, first_rows_by_id, frame_nbytes, is_sorted_by
 from src.models.forecasting import make_timeseries_dataframe
 import logging
 from AutoML.manager import automl_manager
 import asyncio
+import threading
+from collections import OrderedDict
 
-from pandas import ExcelWriter
+from utils.excel_reader import read_excel
+from utils.excel_writer import BEST_MODEL_FORMAT, excel_writer, write_excel, write_frame, write_rows
 
 router = APIRouter()
 
+# Кэш подготовленных данных для прогноза. Ключ — файл parquet (путь, mtime, размер)
+# и параметры подготовки, поэтому повторный прогноз по той же сессии не парсит
+# даты, не считает праздники и не заполняет пропуски заново.
+# Ограничен и числом записей, и суммарным объёмом: большие датасеты не копятся в памяти.
+_PREPARED_CACHE_MAX_ITEMS = 4
+_PREPARED_CACHE_MAX_BYTES = 512 * 1024 * 1024
+_prepared_frames = OrderedDict()
+_prepared_frames_bytes = 0
+_prepared_frames_lock = threading.Lock()
+
+
+def load_prepared_frame(parquet_file: str, dt_col: str, id_col: str, use_holidays: bool,
+                        fill_method: str, fill_group_cols) -> pd.DataFrame:
+    """
+    Читает обучающие данные из parquet и готовит их к прогнозу (даты, праздники, пропуски).
+    Результат кэшируется, пока файл не изменился. Возвращаемый датафрейм
+    разделяется между вызовами и не должен изменяться на месте.
+    """
+    global _prepared_frames_bytes
+    stat = os.stat(parquet_file)
+    key = (
+        parquet_file, stat.st_mtime_ns, stat.st_size,
+        dt_col, id_col, bool(use_holidays), fill_method, tuple(fill_group_cols or ()),
+    )
+    with _prepared_frames_lock:
+        cached = _prepared_frames.get(key)
+        if cached is not None:
+            _prepared_frames.move_to_end(key)
+            logging.info(f"Подготовленные данные взяты из кэша: {parquet_file}")
+            return cached[0]
+
+    try:
+        df = pd.read_parquet(parquet_file)
+        logging.info(f"Файл с обучающими данными успешно загружен: {parquet_file}")
+    except Exception as e:
+        logging.error(f"Ошибка чтения parquet файла данных: {e}")
+        raise HTTPException(status_code=400, detail=f"Ошибка чтения parquet файла данных: {e}")
+
+    if not pd.api.types.is_datetime64_any_dtype(df[dt_col]):
+        df[dt_col] = pd.to_datetime(df[dt_col], errors="coerce")
+    # Последующие шаги (праздники, пропуски, TimeSeriesDataFrame) упираются
+    # в пропускную способность памяти; ужимаем только целые колонки — без потерь
+    df = downcast_numeric(df, exclude=(id_col,))
+    if use_holidays:
+        df = add_russian_holiday_feature(df, date_col=dt_col, holiday_col="russian_holiday")
+        logging.info("Добавлен признак российских праздников")
+    df = fill_missing_values(df, fill_method, fill_group_cols)
+    logging.info(f"Пропущенные значения обработаны методом: {fill_method}")
+    # Сортируем один раз здесь: convert_to_timeseries увидит отсортированные данные и не будет сортировать снова
+    if not is_sorted_by(df, [id_col, dt_col]):
+        df = df.sort_values([id_col, dt_col], kind="stable", ignore_index=True)
+
+    nbytes = frame_nbytes(df)
+    if nbytes > _PREPARED_CACHE_MAX_BYTES:
+        return df
+    with _prepared_frames_lock:
+        # Старые версии того же файла (до переобучения) больше не понадобятся
+        for cached_key in [k for k in _prepared_frames if k[0] == parquet_file]:
+            _prepared_frames_bytes -= _prepared_frames.pop(cached_key)[1]
+        _prepared_frames[key] = (df, nbytes)
+        _prepared_frames_bytes += nbytes
+        while (len(_prepared_frames) > _PREPARED_CACHE_MAX_ITEMS
+               or _prepared_frames_bytes > _PREPARED_CACHE_MAX_BYTES):
+            _prepared_frames_bytes -= _prepared_frames.popitem(last=False)[1][1]
+    return df
+
+
+# Готовый xlsx последнего прогноза по сессии. Повторный запрос /predict при неизменных
+# файлах сессии (данные, параметры, модели, лидерборд) отдаёт его без повторного прогноза.
+_PREDICTION_CACHE_MAX_ITEMS = 8
+_PREDICTION_CACHE_MAX_BYTES = 128 * 1024 * 1024
+_prediction_outputs = OrderedDict()
+_prediction_outputs_bytes = 0
+_prediction_outputs_lock = threading.Lock()
+
+
+def prediction_inputs_signature(session_id: str):
+    """
+    Отпечаток входов прогноза: (путь, mtime_ns, размер) файлов сессии, от которых зависит результат.
+    Возвращает None, если папки сессии нет.
+    """
+    session_path = get_session_path(session_id)
+    if not os.path.isdir(session_path):
+        return None
+    entries = []
+    with os.scandir(session_path) as it:
+        for entry in it:
+            # Файлы прогноза — это выход, а не вход
+            if entry.is_file() and not entry.name.startswith("prediction_"):
+                stat = entry.stat()
+                entries.append((entry.name, stat.st_mtime_ns, stat.st_size))
+    for rel_path in (os.path.join("autogluon", "predictor.pkl"), os.path.join("pycaret", "pycaret_predictions.csv")):
+        try:
+            stat = os.stat(os.path.join(session_path, rel_path))
+        except FileNotFoundError:
+            continue
+        entries.append((rel_path, stat.st_mtime_ns, stat.st_size))
+    return tuple(sorted(entries))
+
+
 def predict_timeseries(session_id: str):
 
     logging.info(f"[predict_timeseries] Начало прогноза для session_id={session_id}")
@@ -44,12 +146,6 @@ def predict_timeseries(session_id: str):
     if not os.path.exists(parquet_file):
         logging.error(f"Файл с обучающими данными (parquet) не найден для session_id={session_id}")
         raise HTTPException(status_code=404, detail="Файл с обучающими данными (parquet) не найден")
-    try:
-        df = pd.read_parquet(parquet_file)
-        logging.info(f"Файл с обучающими данными успешно загружен: {parquet_file}")
-    except Exception as e:
-        logging.error(f"Ошибка чтения parquet файла данных: {e}")
-        raise HTTPException(status_code=400, detail=f"Ошибка чтения parquet файла данных: {e}")
 
     # 4. Подготовка данных (аналогично обучению)
     dt_col = params["datetime_column"]
@@ -61,13 +157,7 @@ def predict_timeseries(session_id: str):
     use_holidays = params.get("use_russian_holidays", False)
     static_feats = params.get("static_feature_columns", [])
 
-    df[dt_col] = pd.to_datetime(df[dt_col], errors="coerce")
-    if use_holidays:
-        df = add_russian_holiday_feature(df, date_col=dt_col, holiday_col="russian_holiday")
-        logging.info("Добавлен признак российских праздников")
-    df = fill_missing_values(df, fill_method, fill_group_cols)
-    
-    logging.info(f"Пропущенные значения обработаны методом: {fill_method}")
+    df = load_prepared_frame(parquet_file, dt_col, id_col, use_holidays, fill_method, fill_group_cols)
 
     if len(df) != 0:
         best_strategy = automl_manager.get_best_strategy(session_id)
@@ -94,9 +184,10 @@ def predict_timeseries(session_id: str):
         try:
             static_df = pd.read_parquet(static_path)
             # Оставляем только уникальные id
-            static_df = static_df.drop_duplicates(subset=[id_col])
-            # left join preds + static_df по id_col
-            preds = preds.merge(static_df, on=id_col, how='left')
+            static_df = first_rows_by_id(static_df, id_col)
+            # left join preds + static_df по id_col: id уже уникальны, join по индексу
+            # быстрее merge по колонке; суффиксы совпадающих колонок — как у merge
+            preds = preds.join(static_df.set_index(id_col), on=id_col, lsuffix='_x', rsuffix='_y')
             logging.info(f"Статические признаки добавлены к результату прогноза из {static_path}")
         except Exception as e:
             logging.warning(f"Не удалось добавить статические признаки: {e}")
@@ -116,16 +207,42 @@ def save_prediction(output, session_id):
 @router.get("/predict/{session_id}")
 async def predict_timeseries_endpoint(session_id: str):
     """Сделать прогноз по id сессии и вернуть xlsx файл с результатом."""
-    
-    preds = await asyncio.to_thread(predict_timeseries, session_id)
-
-    output = BytesIO()
-    # Удаляем индекс, если он есть, чтобы не было столбца с цифрами
-    
-    preds.to_excel(output, index=False)
-    output.seek(0)
-
-    save_prediction(output, session_id)
+    global _prediction_outputs_bytes
+    signature = await asyncio.to_thread(prediction_inputs_signature, session_id)
+    with _prediction_outputs_lock:
+        cached = _prediction_outputs.get(session_id)
+        if cached is not None and signature is not None and cached[0] == signature:
+            _prediction_outputs.move_to_end(session_id)
+        elif cached is not None:
+            # Входы изменились или сессия удалена — устаревший xlsx больше не нужен
+            del _prediction_outputs[session_id]
+            _prediction_outputs_bytes -= len(cached[1])
+            cached = None
+
+    if cached is not None:
+        logging.info(f"[predict_timeseries] Входы сессии не менялись, отдаём прошлый прогноз (session_id={session_id})")
+        output = BytesIO(cached[1])
+    else:
+        preds = await asyncio.to_thread(predict_timeseries, session_id)
+
+        output = BytesIO()
+        # Сборка xlsx занимает секунды на больших прогнозах — не держим event loop
+        await asyncio.to_thread(write_excel, preds, output, index=False)
+        output.seek(0)
+
+        payload = output.getvalue()
+        if signature is not None and len(payload) <= _PREDICTION_CACHE_MAX_BYTES:
+            with _prediction_outputs_lock:
+                old = _prediction_outputs.pop(session_id, None)
+                if old is not None:
+                    _prediction_outputs_bytes -= len(old[1])
+                _prediction_outputs[session_id] = (signature, payload)
+                _prediction_outputs_bytes += len(payload)
+                while (len(_prediction_outputs) > _PREDICTION_CACHE_MAX_ITEMS
+                       or _prediction_outputs_bytes > _PREDICTION_CACHE_MAX_BYTES):
+                    _prediction_outputs_bytes -= len(_prediction_outputs.popitem(last=False)[1][1])
+
+    await asyncio.to_thread(save_prediction, output, session_id)
     
     # Возвращаем файл
     logging.info(f"[predict_timeseries] Отправка файла пользователю (session_id={session_id})")
@@ -137,30 +254,21 @@ async def predict_timeseries_endpoint(session_id: str):
         }
     )
 
-@router.get("/download_prediction/{session_id}")
-def download_prediction_file(session_id: str):
-    """Скачать ранее сохранённый файл прогноза по id сессии с добавлением leaderboard, параметров и весов."""
-
-
-
-    logging.info(f"[download_prediction_file] Запрос на скачивание xlsx для session_id={session_id}")
+def build_prediction_report(session_id: str) -> bytes:
+    """
+    Собирает xlsx с прогнозом и листами метаинформации:
+    Prediction, Leaderboard, TrainingParams, WeightedEnsemble, Messages, PyCaret_Leaderboards.
+    Общая сборка для /download_prediction и /train_predict_base64.
+    """
     session_path = get_session_path(session_id)
     prediction_file_path = os.path.join(session_path, f"prediction_{session_id}.xlsx")
     leaderboard_path = os.path.join(session_path, "leaderboard.csv")
     metadata_path = os.path.join(session_path, "metadata.json")
-
-
-    # Проверяем наличие файла прогноза
     if not os.path.exists(prediction_file_path):
-        logging.error(f"Файл прогноза не найден: {prediction_file_path}")
-        raise HTTPException(status_code=404, detail="Файл прогноза не найден")
+        raise FileNotFoundError(f"Файл прогноза не найден: {prediction_file_path}")
 
     # Читаем прогноз
-    try:
-        df_pred = pd.read_excel(prediction_file_path)
-    except Exception as e:
-        logging.error(f"Ошибка чтения файла прогноза: {e}")
-        raise HTTPException(status_code=500, detail=f"Ошибка чтения файла прогноза: {e}")
+    df_pred = read_excel(prediction_file_path)
 
     # Читаем leaderboard
     df_leaderboard = None
@@ -173,10 +281,10 @@ def download_prediction_file(session_id: str):
 
     # Читаем параметры обучения
     params_dict = None
+    metadata = None
     if os.path.exists(metadata_path):
         try:
-            with open(metadata_path, "r", encoding="utf-8") as f:
-                metadata = json.load(f)
+            metadata = load_json_file(metadata_path)
             params_dict = metadata.get("training_parameters", {})
         except Exception as e:
             logging.warning(f"Не удалось прочитать параметры обучения: {e}")
@@ -191,8 +299,7 @@ def download_prediction_file(session_id: str):
         autogluon_metadata = os.path.join(session_path, "autogluon", "model_metadata.json")
         if os.path.exists(autogluon_metadata):
             try:
-                with open(autogluon_metadata, "r", encoding="utf-8") as f:
-                    model_metadata = json.load(f)
+                model_metadata = load_json_file(autogluon_metadata)
                 weights_dict = model_metadata.get("weightedEnsemble", None)
             except Exception as e:
                 logging.warning(f"Не удалось прочитать веса WeightedEnsemble: {e}")
@@ -216,16 +323,16 @@ def download_prediction_file(session_id: str):
 
     # Формируем новый Excel-файл с несколькими листами
     output = BytesIO()
-    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
+    with excel_writer(output) as writer:
         # Первый лист — прогноз
-        df_pred.to_excel(writer, sheet_name="Prediction", index=False)
+        write_frame(writer, df_pred, "Prediction")
         # Второй лист — leaderboard
         if df_leaderboard is not None:
             df_leaderboard.to_excel(writer, sheet_name="Leaderboard", index=False)
             # Подсветка первой строки (лучшей модели) зелёным
             workbook  = writer.book
             worksheet = writer.sheets["Leaderboard"]
-            green_format = workbook.add_format({'bg_color': '#C6EFCE', 'font_color': '#006100'})
+            green_format = workbook.add_format(BEST_MODEL_FORMAT)
             # Если есть хотя бы одна строка и один столбец
             if not df_leaderboard.empty:
                 worksheet.set_row(1, None, green_format)  # row=1, потому что row=0 — это заголовки
@@ -233,26 +340,19 @@ def download_prediction_file(session_id: str):
             pd.DataFrame({"info": ["Leaderboard not found"]}).to_excel(writer, sheet_name="Leaderboard", index=False)
         # Третий лист — параметры обучения
         if params_dict is not None:
-            pd.DataFrame(list(params_dict.items()), columns=["Parameter", "Value"]).to_excel(writer, sheet_name="TrainingParams", index=False)
+            write_rows(writer, "TrainingParams", ["Parameter", "Value"], params_dict.items())
         else:
             pd.DataFrame({"info": ["Training parameters not found"]}).to_excel(writer, sheet_name="TrainingParams", index=False)
         # Четвертый лист — веса WeightedEnsemble
         if weights_dict is not None and isinstance(weights_dict, dict) and len(weights_dict) > 0:
-            pd.DataFrame(list(weights_dict.items()), columns=["Model", "Weight"]).to_excel(writer, sheet_name="WeightedEnsemble", index=False)
+            write_rows(writer, "WeightedEnsemble", ["Model", "Weight"], weights_dict.items())
         else:
             pd.DataFrame({"info": ["WeightedEnsemble weights not found"]}).to_excel(writer, sheet_name="WeightedEnsemble", index=False)
         # Пятый лист — messages из metadata.json
-        messages = None
-        if os.path.exists(metadata_path):
-            try:
-                with open(metadata_path, "r", encoding="utf-8") as f:
-                    metadata = json.load(f)
-                messages = metadata.get("messages", None)
-            except Exception as e:
-                logging.warning(f"Не удалось прочитать messages из metadata.json: {e}")
-                messages = None
+        # metadata.json уже прочитан выше вместе с параметрами обучения
+        messages = metadata.get("messages", None) if metadata is not None else None
         if messages and isinstance(messages, list) and len(messages) > 0:
-            pd.DataFrame({"messages": messages}).to_excel(writer, sheet_name="Messages", index=False)
+            write_rows(writer, "Messages", ["messages"], ((message,) for message in messages))
         else:
             pd.DataFrame({"info": ["Messages not found"]}).to_excel(writer, sheet_name="Messages", index=False)
         # Лист с объединёнными leaderboard для PyCaret с разделителями
@@ -261,11 +361,24 @@ def download_prediction_file(session_id: str):
             df_pycaret_all.to_excel(writer, sheet_name="PyCaret_Leaderboards", index=False)
         else:
             pd.DataFrame({"info": ["PyCaret leaderboards not found"]}).to_excel(writer, sheet_name="PyCaret_Leaderboards", index=False)
-    output.seek(0)
+    return output.getvalue()
+
+@router.get("/download_prediction/{session_id}")
+def download_prediction_file(session_id: str):
+    """Скачать ранее сохранённый файл прогноза по id сессии с добавлением leaderboard, параметров и весов."""
+    logging.info(f"[download_prediction_file] Запрос на скачивание xlsx для session_id={session_id}")
+    try:
+        content = build_prediction_report(session_id)
+    except FileNotFoundError as e:
+        logging.error(str(e))
+        raise HTTPException(status_code=404, detail="Файл прогноза не найден")
+    except Exception as e:
+        logging.error(f"Ошибка чтения файла прогноза: {e}")
+        raise HTTPException(status_code=500, detail=f"Ошибка чтения файла прогноза: {e}")
 
     logging.info(f"[download_prediction_file] Мульти-листовой Excel-файл отправлен: prediction_{session_id}.xlsx")
     return Response(
-        content=output.getvalue(),
+        content=content,
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         headers={
             "Content-Disposition": f"attachment; filename=prediction_{session_id}.xlsx"
@@ -285,7 +398,7 @@ def download_prediction_csv_file(session_id: str):
     # Если CSV уже есть, используем его, иначе конвертируем из xlsx
     if not os.path.exists(prediction_csv_path):
         try:
-            df = pd.read_excel(prediction_xlsx_path)
+            df = read_excel(prediction_xlsx_path)
             df.to_csv(prediction_csv_path, index=False, encoding="utf-8-sig")
             logging.info(f"[download_prediction_csv_file] Конвертация xlsx в csv: {prediction_csv_path}")
         except Exception as e:
@@ -1,14 +1,27 @@
 import os
 import json
 import shutil
+import tempfile
 from typing import Dict, Any
 from datetime import datetime
 
 import pandas as pd
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 # Base path for all training sessions - now relative to backend/app directory
 SESSIONS_BASE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "training_sessions")
 
+# mkstemp создаёт файл с правами 0600; чтобы JSON получал те же права, что и через open(),
+# выставляем 0666 с учётом umask. umask читаем один раз при импорте: os.umask меняет его
+# для всего процесса, и повторять это из потоков небезопасно
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
 def get_session_path(session_id: str) -> str:
     """Get the full path to a session directory."""
     return os.path.join(SESSIONS_BASE_PATH, session_id)
@@ -19,23 +32,57 @@ def create_session_directory(session_id: str) -> str:
     os.makedirs(session_path, exist_ok=True)
     return session_path
 
+def save_json_file(path: str, data: Dict[str, Any]) -> None:
+    """Save a dict as indented JSON, replacing the file atomically."""
+    if ORJSON_AVAILABLE:
+        # Даты по-прежнему пишутся через str(), как в json.dump(default=str)
+        payload = orjson.dumps(
+            data,
+            default=str,
+            option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+            | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME,
+        )
+    else:
+        payload = json.dumps(data, indent=2, default=str).encode("utf-8")
+    # Пишем во временный файл рядом и атомарно подменяем: опрос статуса
+    # никогда не увидит недописанный JSON
+    directory, filename = os.path.split(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory or ".", prefix=f"{filename}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            os.fchmod(f.fileno(), 0o666 & ~_UMASK)
+            f.write(payload)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
 def save_session_metadata(session_id: str, metadata: Dict[str, Any]) -> None:
     """Save session metadata to the session directory."""
     session_path = get_session_path(session_id)
-    metadata_path = os.path.join(session_path, "metadata.json")
-    with open(metadata_path, "w", encoding="utf-8") as f:
-        json.dump(metadata, f, indent=2, default=str)
+    save_json_file(os.path.join(session_path, "metadata.json"), metadata)
 
-def load_session_metadata(session_id: str) -> Dict[str, Any]:
-    """Load session metadata from the session directory."""
-    session_path = get_session_path(session_id)
-    metadata_path = os.path.join(session_path, "metadata.json")
+def load_json_file(path: str) -> Dict[str, Any]:
+    """
+    Load a JSON file (via orjson when available). Returns {} if the file does not exist.
+    """
     try:
-        with open(metadata_path, "r", encoding="utf-8") as f:
+        if ORJSON_AVAILABLE:
+            with open(path, "rb") as f:
+                return orjson.loads(f.read())
+        with open(path, "r", encoding="utf-8") as f:
             return json.load(f)
     except FileNotFoundError:
         return {}
 
+def load_session_metadata(session_id: str) -> Dict[str, Any]:
+    """Load session metadata from the session directory."""
+    session_path = get_session_path(session_id)
+    return load_json_file(os.path.join(session_path, "metadata.json"))
+
 def cleanup_old_sessions(max_age_days: int = 7) -> None:
     """Remove session directories older than max_age_days."""
     if not os.path.exists(SESSIONS_BASE_PATH):
@@ -1,10 +1,79 @@
 # src/data/data_preparation.py
-import pandas as pd
+import hashlib
 import logging
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
 from src.features.feature_engineering import add_russian_holiday_feature, fill_missing_values
-from src.data.data_processing import convert_to_timeseries
+from src.data.data_processing import build_static_features, convert_to_timeseries, frame_nbytes
 from src.models.forecasting import make_timeseries_dataframe
 
+# Кэш готовых TimeSeriesDataFrame: повторный прогноз по тем же данным
+# не должен заново переименовывать, сортировать и собирать индекс.
+# Ограничен и числом записей, и суммарным объёмом
+_TS_CACHE_MAX_ITEMS = 8
+_TS_CACHE_MAX_BYTES = 512 * 1024 * 1024
+_ts_cache = OrderedDict()
+_ts_cache_bytes = 0
+_ts_cache_lock = threading.Lock()
+
+
+def frame_fingerprint(df):
+    """
+    Возвращает хэш содержимого датафрейма (значения, индекс и названия колонок).
+    """
+    if df is None:
+        return None
+    row_hashes = pd.util.hash_pandas_object(df, index=True).to_numpy()
+    # xxh3 заметно быстрее sha1 на больших буферах; криптостойкость здесь не нужна
+    digest = xxhash.xxh3_128() if XXHASH_AVAILABLE else hashlib.sha1()
+    digest.update(row_hashes.tobytes())
+    digest.update(repr(tuple(df.columns)).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def build_timeseries_dataframe(df, id_col, dt_col, tgt_col, static_df=None):
+    """
+    convert_to_timeseries + make_timeseries_dataframe с кэшированием по отпечатку данных.
+
+    При повторном вызове с теми же данными и параметрами возвращается
+    ранее построенный TimeSeriesDataFrame. Результат разделяется между
+    вызовами, поэтому изменять его на месте нельзя.
+    """
+    global _ts_cache_bytes
+    key = (frame_fingerprint(df), id_col, dt_col, tgt_col, frame_fingerprint(static_df))
+    with _ts_cache_lock:
+        cached = _ts_cache.get(key)
+        if cached is not None:
+            _ts_cache.move_to_end(key)
+            logging.info("TimeSeriesDataFrame взят из кэша")
+            return cached[0]
+
+    df_ready = convert_to_timeseries(df, id_col, dt_col, tgt_col)
+    ts_df = make_timeseries_dataframe(df_ready, static_df=static_df)
+
+    nbytes = frame_nbytes(ts_df)
+    if nbytes > _TS_CACHE_MAX_BYTES:
+        return ts_df
+    with _ts_cache_lock:
+        old = _ts_cache.pop(key, None)
+        if old is not None:
+            _ts_cache_bytes -= old[1]
+        _ts_cache[key] = (ts_df, nbytes)
+        _ts_cache_bytes += nbytes
+        while len(_ts_cache) > _TS_CACHE_MAX_ITEMS or _ts_cache_bytes > _TS_CACHE_MAX_BYTES:
+            _ts_cache_bytes -= _ts_cache.popitem(last=False)[1][1]
+    return ts_df
+
+
 def prepare_timeseries_data(df, dt_col, id_col, tgt_col, 
                           static_feats=None, 
                           use_holidays=False,
@@ -37,7 +106,8 @@ def prepare_timeseries_data(df, dt_col, id_col, tgt_col,
     tuple
         (ts_df, static_df) - подготовленный TimeSeriesDataFrame и статические признаки
     """
-    df_copy = df.copy()
+    # Колонки ниже заменяются целиком, исходный df не меняется и без глубокой копии
+    df_copy = df.copy(deep=False)
     
     # Проверка необходимых колонок
     required_cols = [dt_col, tgt_col, id_col]
@@ -60,14 +130,9 @@ def prepare_timeseries_data(df, dt_col, id_col, tgt_col,
         df_copy = fill_missing_values(df_copy, method=fill_method, group_cols=group_cols)
     
     # Подготовка статических признаков
-    static_df = None
-    if static_feats:
-        tmp = df_copy[[id_col] + static_feats].drop_duplicates(subset=[id_col]).copy()
-        tmp.rename(columns={id_col: "item_id"}, inplace=True)
-        static_df = tmp
+    static_df = build_static_features(df_copy, id_col, static_feats)
     
     # Преобразование в TimeSeriesDataFrame
-    df_ready = convert_to_timeseries(df_copy, id_col, dt_col, tgt_col)
-    ts_df = make_timeseries_dataframe(df_ready, static_df=static_df)
+    ts_df = build_timeseries_dataframe(df_copy, id_col, dt_col, tgt_col, static_df=static_df)
     
     return ts_df, static_df
\ No newline at end of file
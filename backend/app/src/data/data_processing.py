@@ -177,6 +177,59 @@ def _load_csv_in_chunks(uploaded_file, chunk_size):
     
     return df
 
+def downcast_numeric(df: pd.DataFrame, exclude=()) -> pd.DataFrame:
+    """
+    Понижает разрядность целочисленных колонок (int64 -> минимальный целый тип) — без потерь.
+    float64 не трогаем: downcast="float" допускает округление (1234.56 -> 1234.56005859375),
+    и целевая переменная с признаками разошлись бы с данными, на которых обучались модели.
+    Колонки из exclude (например, идентификаторы) не трогаются. Изменяет df на месте и возвращает его.
+    """
+    for col in df.select_dtypes(include=["int64"]).columns:
+        if col not in exclude:
+            df[col] = pd.to_numeric(df[col], downcast="integer")
+    return df
+
+def first_rows_by_id(df: pd.DataFrame, id_col: str, columns=None) -> pd.DataFrame:
+    """
+    Возвращает первую строку для каждого значения id_col (аналог drop_duplicates(subset=[id_col])).
+
+    Индексы первых вхождений считаются на целочисленных кодах pd.factorize,
+    без хэширования всех выбранных колонок. Строки и колонки выбираются одним
+    позиционным take, без промежуточной копии выбранных колонок целиком.
+    """
+    codes, _ = pd.factorize(df[id_col], sort=False, use_na_sentinel=False)
+    _, first_idx = np.unique(codes, return_index=True)
+    if columns is None:
+        return df.iloc[first_idx]
+    return df.iloc[first_idx, df.columns.get_indexer(columns)]
+
+def frame_nbytes(df: pd.DataFrame) -> int:
+    """
+    Объём датафрейма в памяти с индексом и строками (deep) — для бюджета кэшей в байтах.
+    """
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+def is_sorted_by(df: pd.DataFrame, columns) -> bool:
+    """
+    Проверяет, что датафрейм уже отсортирован по возрастанию по указанным колонкам.
+    Проверка линейная (без сортировки); при пропусках в ключах возвращает False.
+    """
+    if len(columns) == 1:
+        return df[columns[0]].is_monotonic_increasing
+    return pd.MultiIndex.from_arrays([df[col] for col in columns]).is_monotonic_increasing
+
+def build_static_features(df: pd.DataFrame, id_col: str, static_feats) -> Optional[pd.DataFrame]:
+    """
+    Готовит таблицу статических признаков для TimeSeriesDataFrame:
+    первая строка на каждый ID, колонка id_col переименована в item_id.
+    Возвращает None, если статические признаки не заданы.
+    """
+    if not static_feats:
+        return None
+    static_df = first_rows_by_id(df, id_col, [id_col] + list(static_feats))
+    static_df.rename(columns={id_col: "item_id"}, inplace=True)
+    return static_df
+
 def convert_to_timeseries(df: pd.DataFrame, id_col: str, timestamp_col: str, target_col: str) -> pd.DataFrame:
     """
     Преобразует DataFrame в формат с колонками (item_id, timestamp, target).
@@ -203,9 +256,6 @@ def convert_to_timeseries(df: pd.DataFrame, id_col: str, timestamp_col: str, tar
     if missing_cols:
         raise ValueError(f"Отсутствуют необходимые колонки: {', '.join(missing_cols)}")
     
-    # Создаем копию датафрейма, чтобы не изменять оригинал
-    df_local = df.copy()
-    
     # Переименовываем колонки
     column_mapping = {
         id_col: "item_id",
@@ -213,18 +263,36 @@ def convert_to_timeseries(df: pd.DataFrame, id_col: str, timestamp_col: str, tar
         target_col: "target"
     }
     
-    # Выполняем переименование с проверкой успешности
-    df_local = df_local.rename(columns=column_mapping)
+    # rename возвращает копию, поэтому оригинал не изменяется и отдельный copy() не нужен
+    df_local = df.rename(columns=column_mapping)
     
     # Проверяем, что колонки были успешно переименованы
     for new_col in ["item_id", "timestamp", "target"]:
         if new_col not in df_local.columns:
             raise ValueError(f"Не удалось создать колонку '{new_col}'. Проверьте правильность указанных имен колонок.")
     
+    # Цель с None (например, NULL из БД или пустые ячейки Excel) приходит как object:
+    # один раз приводим к float с NaN, чтобы дальше не гонять Python-объекты.
+    # Нечисловые строки ("1,5", "n/a") не превращаем молча в пропуски — это ошибка данных
+    if pd.api.types.is_object_dtype(df_local["target"]):
+        target = pd.to_numeric(df_local["target"], errors="coerce")
+        bad = target.isna().to_numpy() & df_local["target"].notna().to_numpy()
+        if bad.any():
+            bad_rows = df_local.loc[bad, "target"]
+            examples = ", ".join(f"{idx}: {value!r}" for idx, value in bad_rows.head(5).items())
+            raise ValueError(
+                f"Целевая колонка '{target_col}' содержит нечисловые значения "
+                f"({bad.sum()} шт., строки: {examples})"
+            )
+        df_local["target"] = target.astype("float64")
+    
     # УБРАНО: Преобразуем item_id в строку и сортируем
     # df_local["item_id"] = df_local["item_id"].astype(str)
-    df_local = df_local.sort_values(["item_id", "timestamp"])
-    df_local = df_local.reset_index(drop=True)
+    if is_sorted_by(df_local, ["item_id", "timestamp"]):
+        # Данные уже отсортированы выше по конвейеру — повторная сортировка не нужна
+        df_local.index = pd.RangeIndex(len(df_local))
+    else:
+        df_local = df_local.sort_values(["item_id", "timestamp"], ignore_index=True)
     
     # Логирование результата
     logging.info(f"Преобразовано в TimeSeriesDataFrame формат. Колонки: {list(df_local.columns)}")
@@ -269,7 +337,8 @@ def split_train_test(df: pd.DataFrame,
     """
     # Убеждаемся, что колонка даты в формате datetime
     if not pd.api.types.is_datetime64_any_dtype(df[date_col]):
-        df = df.copy()
+        # Заменяется только колонка даты — данные остальных колонок не копируем
+        df = df.copy(deep=False)
         df[date_col] = pd.to_datetime(df[date_col])
     
     # Сортируем по дате
@@ -313,64 +382,41 @@ def detect_outliers(df: pd.DataFrame,
     Tuple[pd.DataFrame, pd.DataFrame]
         Датафрейм без выбросов и датафрейм только с выбросами
     """
-    df_outliers = pd.DataFrame()
-    df_clean = df.copy()
-    
-    if method == 'iqr':
-        if id_col and id_col in df.columns:
-            # Обрабатываем каждый ID отдельно
-            for id_val in df[id_col].unique():
-                mask = df[id_col] == id_val
-                subset = df[mask]
-                
-                q1 = subset[target_col].quantile(0.25)
-                q3 = subset[target_col].quantile(0.75)
-                iqr = q3 - q1
-                
-                lower_bound = q1 - 1.5 * iqr
-                upper_bound = q3 + 1.5 * iqr
-                
-                outliers_mask = (subset[target_col] < lower_bound) | (subset[target_col] > upper_bound)
-                df_outliers = pd.concat([df_outliers, subset[outliers_mask]])
-                
-                # Обновляем маску для очищенного датафрейма
-                clean_indices = subset[~outliers_mask].index
-                df_clean = df_clean.loc[df_clean.index.isin(clean_indices) | ~df_clean[id_col].isin([id_val])]
-        else:
-            # Обрабатываем весь датасет как один ряд
+    if id_col and id_col in df.columns:
+        # Один проход groupby вместо булевой маски и pd.concat на каждый ID
+        grouped = df.groupby(id_col, sort=False)[target_col]
+        if method == 'iqr':
+            q1 = grouped.transform('quantile', 0.25)
+            q3 = grouped.transform('quantile', 0.75)
+        elif method == 'zscore':
+            mean = grouped.transform('mean')
+            std = grouped.transform('std')
+    else:
+        # Обрабатываем весь датасет как один ряд
+        if method == 'iqr':
             q1 = df[target_col].quantile(0.25)
             q3 = df[target_col].quantile(0.75)
-            iqr = q3 - q1
-            
-            lower_bound = q1 - 1.5 * iqr
-            upper_bound = q3 + 1.5 * iqr
-            
-            outliers_mask = (df[target_col] < lower_bound) | (df[target_col] > upper_bound)
-            df_outliers = df[outliers_mask]
-            df_clean = df[~outliers_mask]
-    
+        elif method == 'zscore':
+            mean = df[target_col].mean()
+            std = df[target_col].std()
+
+    if method == 'iqr':
+        iqr = q3 - q1
+        lower_bound = q1 - 1.5 * iqr
+        upper_bound = q3 + 1.5 * iqr
+        outliers_mask = (df[target_col] < lower_bound) | (df[target_col] > upper_bound)
     elif method == 'zscore':
-        if id_col and id_col in df.columns:
-            # Обрабатываем каждый ID отдельно
-            for id_val in df[id_col].unique():
-                mask = df[id_col] == id_val
-                subset = df[mask]
-                
-                z_scores = np.abs((subset[target_col] - subset[target_col].mean()) / subset[target_col].std())
-                outliers_mask = z_scores > 3
-                
-                df_outliers = pd.concat([df_outliers, subset[outliers_mask]])
-                
-                # Обновляем маску для очищенного датафрейма
-                clean_indices = subset[~outliers_mask].index
-                df_clean = df_clean.loc[df_clean.index.isin(clean_indices) | ~df_clean[id_col].isin([id_val])]
-        else:
-            # Обрабатываем весь датасет как один ряд
-            z_scores = np.abs((df[target_col] - df[target_col].mean()) / df[target_col].std())
-            outliers_mask = z_scores > 3
-            
-            df_outliers = df[outliers_mask]
-            df_clean = df[~outliers_mask]
+        z_scores = np.abs((df[target_col] - mean) / std)
+        outliers_mask = z_scores > 3
+    else:
+        return df.copy(), pd.DataFrame()
+
+    df_clean = df[~outliers_mask]
+    df_outliers = df[outliers_mask]
+    if id_col and id_col in df.columns and not df_outliers.empty:
+        # Выбросы идут блоками по ID в порядке их первого появления
+        codes = pd.factorize(df[id_col])[0][outliers_mask.to_numpy()]
+        df_outliers = df_outliers.iloc[np.argsort(codes, kind='stable')]
     
     return df_clean, df_outliers
 
@@ -434,7 +480,8 @@ def safely_prepare_timeseries_data(df, dt_col, id_col, tgt_col):
         # Проверка типа данных в колонке с датой
         if not pd.api.types.is_datetime64_any_dtype(df[dt_col]):
             logging.info(f"Преобразование колонки {dt_col} в datetime")
-            df = df.copy()
+            # Колонки только заменяются целиком — глубокая копия всего датафрейма не нужна
+            df = df.copy(deep=False)
             df[dt_col] = pd.to_datetime(df[dt_col], errors="coerce")
             
             # Проверяем результат преобразования
@@ -444,7 +491,7 @@ def safely_prepare_timeseries_data(df, dt_col, id_col, tgt_col):
         
         # Проверяем и преобразуем id_col в строку, если нужно
         if not pd.api.types.is_object_dtype(df[id_col]) and not pd.api.types.is_string_dtype(df[id_col]):
-            df = df.copy() if id(df) == id(df) else df
+            df = df.copy(deep=False)
             df[id_col] = df[id_col].astype(str)
         
         # Преобразуем в формат для TimeSeriesDataFrame
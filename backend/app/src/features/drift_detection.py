@@ -48,14 +48,17 @@ def detect_concept_drift(historical_df: pd.DataFrame,
         "recommendations": []
     }
     
+    # Для анализа нужны только дата, цель и ID: берём эти колонки вместо копии всего датафрейма
+    used_cols = [date_col, target_col] + ([id_col] if id_col else [])
+    historical_df = historical_df[used_cols]
+    new_df = new_df[used_cols]
+    
     # Убеждаемся, что колонки дат в формате datetime
     if not pd.api.types.is_datetime64_any_dtype(historical_df[date_col]):
-        historical_df = historical_df.copy()
-        historical_df[date_col] = pd.to_datetime(historical_df[date_col])
+        historical_df = historical_df.assign(**{date_col: pd.to_datetime(historical_df[date_col])})
     
     if not pd.api.types.is_datetime64_any_dtype(new_df[date_col]):
-        new_df = new_df.copy()
-        new_df[date_col] = pd.to_datetime(new_df[date_col])
+        new_df = new_df.assign(**{date_col: pd.to_datetime(new_df[date_col])})
     
     # Проверяем дрифт в целевой переменной
     try:
@@ -115,11 +118,15 @@ def detect_concept_drift(historical_df: pd.DataFrame,
     # Анализ скользящих средних значений (по времени)
     if id_col:
         # Если есть ID, анализируем дрифт для каждого ID отдельно
-        all_ids = set(historical_df[id_col].unique()) & set(new_df[id_col].unique())
+        all_ids = set(historical_df[id_col].dropna().unique()) & set(new_df[id_col].dropna().unique())
+        
+        # Группируем один раз, чтобы не сканировать датафреймы заново для каждого ID
+        hist_groups = historical_df.groupby(id_col, sort=False)
+        new_groups = new_df.groupby(id_col, sort=False)
         
         for current_id in all_ids:
-            hist_id_data = historical_df[historical_df[id_col] == current_id].sort_values(date_col)
-            new_id_data = new_df[new_df[id_col] == current_id].sort_values(date_col)
+            hist_id_data = hist_groups.get_group(current_id).sort_values(date_col)
+            new_id_data = new_groups.get_group(current_id).sort_values(date_col)
             
             if len(hist_id_data) < window_size or len(new_id_data) < 5:
                 continue
@@ -201,24 +208,22 @@ def create_drift_visualizations(historical_df: pd.DataFrame,
     """
     figures = {}
     
-    # Убеждаемся, что колонки дат в формате datetime
-    if not pd.api.types.is_datetime64_any_dtype(historical_df[date_col]):
-        historical_df = historical_df.copy()
-        historical_df[date_col] = pd.to_datetime(historical_df[date_col])
-    
-    if not pd.api.types.is_datetime64_any_dtype(new_df[date_col]):
-        new_df = new_df.copy()
-        new_df[date_col] = pd.to_datetime(new_df[date_col])
+    # Для графиков нужны только дата, цель и ID — не копируем остальные колонки
+    plot_cols = [date_col, target_col] + ([id_col] if id_col else [])
+    hist_df = historical_df[plot_cols]
+    new_df_copy = new_df[plot_cols]
     
-    # Добавляем метку источника данных
-    hist_df = historical_df.copy()
-    hist_df['source'] = 'Исторические'
+    # Убеждаемся, что колонки дат в формате datetime
+    if not pd.api.types.is_datetime64_any_dtype(hist_df[date_col]):
+        hist_df = hist_df.assign(**{date_col: pd.to_datetime(hist_df[date_col])})
     
-    new_df_copy = new_df.copy()
-    new_df_copy['source'] = 'Новые'
+    if not pd.api.types.is_datetime64_any_dtype(new_df_copy[date_col]):
+        new_df_copy = new_df_copy.assign(**{date_col: pd.to_datetime(new_df_copy[date_col])})
     
-    # Объединяем для сравнения
-    combined_df = pd.concat([hist_df, new_df_copy])
+    # Объединяем для сравнения; метку источника проставляет concat через keys,
+    # без отдельной копии каждого датафрейма ради колонки source
+    sources = ['Исторические', 'Новые']
+    combined_df = pd.concat([hist_df, new_df_copy], keys=sources, names=['source']).reset_index(level=0)
     
     # 1. Распределение целевой переменной
     fig_dist = px.histogram(combined_df, x=target_col, color='source', 
@@ -227,18 +232,22 @@ def create_drift_visualizations(historical_df: pd.DataFrame,
     figures['distribution'] = fig_dist
     
     # 2. Временные ряды
-    if id_col and combined_df[id_col].nunique() > 1:
+    # Размеры групп считаем один раз: и проверка числа ID, и выбор топ-5 по ним
+    id_sizes = combined_df.groupby(id_col).size() if id_col else None
+    if id_sizes is not None and len(id_sizes) > 1:
         # Ограничиваем до 5 наиболее представленных ID
-        top_ids = combined_df.groupby(id_col).size().nlargest(5).index.tolist()
+        top_ids = id_sizes.nlargest(5).index.tolist()
         plot_df = combined_df[combined_df[id_col].isin(top_ids)]
         
         fig_time = px.line(plot_df, x=date_col, y=target_col, 
                          color=id_col, line_dash='source',
-                         title='Сравнение временных рядов (топ-5 ID)')
+                         title='Сравнение временных рядов (топ-5 ID)',
+                         render_mode='webgl')
     else:
         fig_time = px.line(combined_df, x=date_col, y=target_col, 
                          color='source',
-                         title='Сравнение временных рядов')
+                         title='Сравнение временных рядов',
+                         render_mode='webgl')
     
     figures['time_series'] = fig_time
     
@@ -250,12 +259,9 @@ def create_drift_visualizations(historical_df: pd.DataFrame,
     # 4. Scatter plot средних значений по времени (для визуализации трендов)
     if id_col:
         hist_means = hist_df.groupby([pd.Grouper(key=date_col, freq='M')])[target_col].mean().reset_index()
-        hist_means['source'] = 'Исторические'
-        
         new_means = new_df_copy.groupby([pd.Grouper(key=date_col, freq='M')])[target_col].mean().reset_index()
-        new_means['source'] = 'Новые'
         
-        combined_means = pd.concat([hist_means, new_means])
+        combined_means = pd.concat([hist_means, new_means], keys=sources, names=['source']).reset_index(level=0)
         
         fig_trend = px.line(combined_means, x=date_col, y=target_col, color='source',
                            title='Тренды средних месячных значений')
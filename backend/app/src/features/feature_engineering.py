@@ -5,9 +5,78 @@ import streamlit as st
 import holidays
 import logging
 import numpy as np
+from functools import lru_cache
 from typing import List, Optional, Union, Dict, Any
 from scipy import stats
 
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+if NUMBA_AVAILABLE:
+    # Ядра компилируются при первом вызове и без cache=True: кэш numba на диске
+    # привязан к имени модуля, а файл импортируется и как src.features...,
+    # и как backend.app.src.features...
+    @njit
+    def _group_mean_fill(vals, codes, ngroups):
+        """
+        Заполняет NaN в vals средним по группе (на месте).
+        codes — номер группы для каждой строки, -1 для строк без группы.
+        """
+        sums = np.zeros(ngroups)
+        cnts = np.zeros(ngroups, np.int64)
+        for i in range(vals.size):
+            c = codes[i]
+            v = vals[i]
+            if c >= 0 and not np.isnan(v):
+                sums[c] += v
+                cnts[c] += 1
+        for i in range(vals.size):
+            c = codes[i]
+            if c >= 0 and cnts[c] > 0 and np.isnan(vals[i]):
+                vals[i] = sums[c] / cnts[c]
+
+    @njit(parallel=True)
+    def _ffill_bfill_groups(vals, indptr, skip):
+        """
+        ffill + bfill внутри каждой группы (на месте).
+        Строки группы g лежат подряд в vals[indptr[g]:indptr[g + 1]];
+        группы с skip[g] (строки без ключа группы) не трогаются.
+        """
+        for g in prange(indptr.size - 1):
+            if skip[g]:
+                continue
+            start = indptr[g]
+            end = indptr[g + 1]
+            last = np.nan
+            for i in range(start, end):
+                if np.isnan(vals[i]):
+                    vals[i] = last
+                else:
+                    last = vals[i]
+            nxt = np.nan
+            for i in range(end - 1, start - 1, -1):
+                if np.isnan(vals[i]):
+                    vals[i] = nxt
+                else:
+                    nxt = vals[i]
+
+
+def _contiguous_group_bounds(codes):
+    """
+    Для кодов групп отсортированного датафрейма возвращает indptr непрерывных
+    участков и флаг «строки без группы» (код -1) для каждого участка.
+    """
+    if codes.size == 0:
+        return np.zeros(1, np.int64), np.zeros(0, np.bool_)
+    starts = np.flatnonzero(np.diff(codes)) + 1
+    indptr = np.concatenate(([0], starts, [codes.size])).astype(np.int64)
+    skip = codes[indptr[:-1]] < 0
+    return indptr, skip
+
 def fill_missing_values(df: pd.DataFrame, method: str = "None", group_cols=None) -> pd.DataFrame:
     """
     Заполняет пропуски для числовых столбцов.
@@ -16,24 +85,54 @@ def fill_missing_values(df: pd.DataFrame, method: str = "None", group_cols=None)
     if not group_cols:
         group_cols = []
     if len(group_cols) == 1:
-        group_cols = (group_cols[0],)
+        group_cols = [group_cols[0]]
     if method == "None":
         return df
-    elif method == "Constant=0":
+    # Быстрый выход: если пропусков нет, сортировка и groupby не нужны
+    if not df[numeric_cols].isna().to_numpy().any():
+        return df
+    if method != "KNN imputer":
+        # KNN использует все числовые колонки как признаки, остальные методы — поколоночные
+        numeric_cols = [c for c in numeric_cols if df[c].isna().any()]
+    if method == "Constant=0":
         df[numeric_cols] = df[numeric_cols].fillna(0)
         return df
     elif method == "Forward fill":
         if group_cols:
             df = df.sort_values(by=group_cols, na_position="last")
-            df[numeric_cols] = df.groupby(group_cols)[numeric_cols].transform(lambda g: g.ffill().bfill())
+            if NUMBA_AVAILABLE:
+                # После сортировки строки каждой группы идут подряд — заполняем по участкам;
+                # строки с NaN в ключе получают -1 и, как в groupby().transform, становятся NaN
+                codes = df.groupby(group_cols, sort=False).ngroup().fillna(-1).to_numpy(dtype=np.int64)
+                no_group = codes < 0
+                indptr, skip = _contiguous_group_bounds(codes)
+                for c in numeric_cols:
+                    vals = df[c].to_numpy(dtype=np.float64, copy=True)
+                    _ffill_bfill_groups(vals, indptr, skip)
+                    vals[no_group] = np.nan
+                    df[c] = vals.astype(df[c].dtype, copy=False)
+            else:
+                df[numeric_cols] = df.groupby(group_cols)[numeric_cols].transform(lambda g: g.ffill().bfill())
         else:
             df[numeric_cols] = df[numeric_cols].ffill().bfill()
         return df
     elif method == "Group mean":
         if group_cols:
             df = df.sort_values(by=group_cols, na_position="last")
-            for c in numeric_cols:
-                df[c] = df.groupby(group_cols)[c].transform(lambda x: x.fillna(x.mean()))
+            if NUMBA_AVAILABLE:
+                # Коды групп считаются один раз для всех колонок; строки с NaN в ключе
+                # получают -1 и, как в groupby().transform, становятся NaN
+                codes = df.groupby(group_cols, sort=False).ngroup().fillna(-1).to_numpy(dtype=np.int64)
+                no_group = codes < 0
+                ngroups = int(codes.max()) + 1 if codes.size else 0
+                for c in numeric_cols:
+                    vals = df[c].to_numpy(dtype=np.float64, copy=True)
+                    _group_mean_fill(vals, codes, ngroups)
+                    vals[no_group] = np.nan
+                    df[c] = vals.astype(df[c].dtype, copy=False)
+            else:
+                for c in numeric_cols:
+                    df[c] = df.groupby(group_cols)[c].transform(lambda x: x.fillna(x.mean()))
         else:
             for c in numeric_cols:
                 df[c] = df[c].fillna(df[c].mean())
@@ -72,6 +171,14 @@ def fill_missing_values(df: pd.DataFrame, method: str = "None", group_cols=None)
     
     return df
 
+@lru_cache(maxsize=8)
+def _russian_holiday_days(min_year: int, max_year: int) -> np.ndarray:
+    """
+    Возвращает отсортированный массив дат праздников РФ (datetime64[D]) за годы min_year..max_year.
+    """
+    ru_holidays = holidays.country_holidays(country="RU", years=range(min_year, max_year + 1))
+    return np.array(sorted(ru_holidays.keys()), dtype="datetime64[D]")
+
 def add_russian_holiday_feature(df: pd.DataFrame, date_col="timestamp", holiday_col="russian_holiday") -> pd.DataFrame:
     """
     Добавляет колонку с индикатором праздников РФ.
@@ -83,10 +190,13 @@ def add_russian_holiday_feature(df: pd.DataFrame, date_col="timestamp", holiday_
         df[date_col] = pd.to_datetime(df[date_col], errors="coerce")
     min_year = df[date_col].dt.year.min()
     max_year = df[date_col].dt.year.max()
-    ru_holidays = holidays.country_holidays(country="RU", years=range(min_year, max_year + 1))
-    def is_holiday(dt):
-        return 1.0 if dt.date() in ru_holidays else 0.0
-    df[holiday_col] = df[date_col].apply(is_holiday).astype(float)
+    holiday_days = _russian_holiday_days(int(min_year), int(max_year))
+    # Праздник зависит только от даты: проверяем уникальные дни и разворачиваем по кодам
+    codes, unique_days = pd.factorize(df[date_col].dt.normalize())
+    if unique_days.tz is not None:
+        unique_days = unique_days.tz_localize(None)
+    day_flags = np.isin(unique_days.values.astype("datetime64[D]"), holiday_days).astype(float)
+    df[holiday_col] = np.where(codes >= 0, day_flags[codes], 0.0)
     return df
 
 def add_time_features(df: pd.DataFrame, 
@@ -118,7 +228,7 @@ def add_time_features(df: pd.DataFrame,
     
     # Преобразуем к формату datetime, если необходимо
     if not pd.api.types.is_datetime64_any_dtype(df[date_col]):
-        df = df.copy()
+        df = df.copy(deep=False)
         df[date_col] = pd.to_datetime(df[date_col], errors="coerce")
     
     # Создаем копию для добавления новых признаков
@@ -311,7 +421,7 @@ def generate_lag_features(df: pd.DataFrame,
     """
     # Преобразуем к формату datetime, если необходимо
     if not pd.api.types.is_datetime64_any_dtype(df[date_col]):
-        df = df.copy()
+        df = df.copy(deep=False)
         df[date_col] = pd.to_datetime(df[date_col], errors="coerce")
     
     df_result = df.copy()
@@ -366,7 +476,7 @@ def generate_rolling_features(df: pd.DataFrame,
     """
     # Преобразуем к формату datetime, если необходимо
     if not pd.api.types.is_datetime64_any_dtype(df[date_col]):
-        df = df.copy()
+        df = df.copy(deep=False)
         df[date_col] = pd.to_datetime(df[date_col], errors="coerce")
     
     df_result = df.copy()
@@ -48,7 +48,8 @@ def decompose_time_series(df: pd.DataFrame,
     
     # Убеждаемся, что колонка даты в формате datetime
     if not pd.api.types.is_datetime64_any_dtype(df[date_col]):
-        df = df.copy()
+        # Заменяется только колонка даты — данные остальных колонок не копируем
+        df = df.copy(deep=False)
         df[date_col] = pd.to_datetime(df[date_col])
     
     # Определяем частоту данных, если не указан период
@@ -97,6 +98,9 @@ def decompose_time_series(df: pd.DataFrame,
     # Если указан ID, выполняем декомпозицию для каждого ID отдельно
     if id_col and id_col in df.columns:
         unique_ids = df[id_col].unique()
+        # Позиции строк каждого ID за один проход вместо булевой маски на каждый ID
+        grouped = df.groupby(id_col)
+        id_rows = grouped.indices
         
         if len(unique_ids) > 5:
             # Ограничиваем количество рядов для декомпозиции
@@ -106,15 +110,13 @@ def decompose_time_series(df: pd.DataFrame,
             )
             
             # Выбираем 5 ID с наибольшим количеством точек
-            id_counts = df.groupby(id_col).size()
+            id_counts = grouped.size()
             top_ids = id_counts.nlargest(5).index.tolist()
             unique_ids = top_ids
         
         for current_id in unique_ids:
-            subset = df[df[id_col] == current_id].copy()
-            
             # Сортируем по дате и проверяем, что достаточно точек
-            subset = subset.sort_values(date_col)
+            subset = df.iloc[id_rows.get(current_id, [])].sort_values(date_col)
             
             if len(subset) < 2 * period:
                 result["recommendations"].append(
@@ -153,22 +155,22 @@ def decompose_time_series(df: pd.DataFrame,
                 valid_dates = dates[valid_indices]
                 
                 fig.add_trace(
-                    go.Scatter(x=valid_dates, y=decomposition.observed[valid_indices], name="Observed"),
+                    go.Scattergl(x=valid_dates, y=decomposition.observed[valid_indices], name="Observed"),
                     row=1, col=1
                 )
                 
                 fig.add_trace(
-                    go.Scatter(x=valid_dates, y=decomposition.trend[valid_indices], name="Trend"),
+                    go.Scattergl(x=valid_dates, y=decomposition.trend[valid_indices], name="Trend"),
                     row=2, col=1
                 )
                 
                 fig.add_trace(
-                    go.Scatter(x=valid_dates, y=decomposition.seasonal[valid_indices], name="Seasonal"),
+                    go.Scattergl(x=valid_dates, y=decomposition.seasonal[valid_indices], name="Seasonal"),
                     row=3, col=1
                 )
                 
                 fig.add_trace(
-                    go.Scatter(x=valid_dates, y=decomposition.resid[valid_indices], name="Residual"),
+                    go.Scattergl(x=valid_dates, y=decomposition.resid[valid_indices], name="Residual"),
                     row=4, col=1
                 )
                 
@@ -244,22 +246,22 @@ def decompose_time_series(df: pd.DataFrame,
             valid_dates = dates[valid_indices]
             
             fig.add_trace(
-                go.Scatter(x=valid_dates, y=decomposition.observed[valid_indices], name="Observed"),
+                go.Scattergl(x=valid_dates, y=decomposition.observed[valid_indices], name="Observed"),
                 row=1, col=1
             )
             
             fig.add_trace(
-                go.Scatter(x=valid_dates, y=decomposition.trend[valid_indices], name="Trend"),
+                go.Scattergl(x=valid_dates, y=decomposition.trend[valid_indices], name="Trend"),
                 row=2, col=1
             )
             
             fig.add_trace(
-                go.Scatter(x=valid_dates, y=decomposition.seasonal[valid_indices], name="Seasonal"),
+                go.Scattergl(x=valid_dates, y=decomposition.seasonal[valid_indices], name="Seasonal"),
                 row=3, col=1
             )
             
             fig.add_trace(
-                go.Scatter(x=valid_dates, y=decomposition.resid[valid_indices], name="Residual"),
+                go.Scattergl(x=valid_dates, y=decomposition.resid[valid_indices], name="Residual"),
                 row=4, col=1
             )
             
@@ -296,6 +298,28 @@ def decompose_time_series(df: pd.DataFrame,
     
     return result
 
+def combine_decomposition_figures(figures: Dict[str, go.Figure]) -> go.Figure:
+    """
+    Собирает графики декомпозиции нескольких ID в одну фигуру: строки — компоненты, колонки — ID.
+    """
+    ids = list(figures)
+    combined = make_subplots(
+        rows=4, cols=len(ids),
+        column_titles=[f"ID={id_val}" for id_val in ids],
+        row_titles=["Observed", "Trend", "Seasonal", "Residual"],
+        vertical_spacing=0.08
+    )
+    for col, id_val in enumerate(ids, start=1):
+        # В графике отдельного ID трассы идут в порядке строк: Observed, Trend, Seasonal, Residual
+        for row, trace in enumerate(figures[id_val].data, start=1):
+            combined.add_trace(trace, row=row, col=col)
+    combined.update_layout(
+        height=800,
+        title_text="Декомпозиция временных рядов по ID",
+        showlegend=False
+    )
+    return combined
+
 def display_decomposition_results(decomposition_results: Dict[str, Any]):
     """
     Отображает результаты декомпозиции в Streamlit.
@@ -311,10 +335,12 @@ def display_decomposition_results(decomposition_results: Dict[str, Any]):
     
     # Отображаем графики
     if "figures" in decomposition_results:
-        for id_val, fig in decomposition_results["figures"].items():
-            if id_val == "all":
-                st.write("### Декомпозиция для всего ряда")
-            else:
-                st.write(f"### Декомпозиция для ID={id_val}")
-            
-            st.plotly_chart(fig, use_container_width=True)
\ No newline at end of file
+        figures = decomposition_results["figures"]
+        if "all" in figures:
+            st.write("### Декомпозиция для всего ряда")
+            st.plotly_chart(figures["all"], use_container_width=True)
+        id_figures = {id_val: fig for id_val, fig in figures.items() if id_val != "all"}
+        if id_figures:
+            # Один график с колонкой на каждый ID вместо отдельного plotly_chart на ID
+            st.write("### Декомпозиция по ID")
+            st.plotly_chart(combine_decomposition_figures(id_figures), use_container_width=True)
\ No newline at end of file
@@ -1,7 +1,18 @@
 # src/models/forecasting.py
 import logging
+import operator
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import reduce
+
 from autogluon.timeseries import TimeSeriesDataFrame, TimeSeriesPredictor
 
+# Число потоков для прогноза базовых моделей ансамбля. По умолчанию 1 — обычный
+# predictor.predict(): AutoGluon не гарантирует потокобезопасность predict() на одном
+# предикторе, каждый вызов заново готовит входные данные, а пулы потоков torch/LightGBM
+# начинают конкурировать. Включать осознанно, проверив результат на своих моделях.
+ENSEMBLE_PREDICT_WORKERS = int(os.getenv("ENSEMBLE_PREDICT_WORKERS", "1"))
+
 def make_timeseries_dataframe(df, static_df=None):
     """
     Создаёт TimeSeriesDataFrame из df с указанными столбцами.
@@ -15,12 +26,57 @@ def make_timeseries_dataframe(df, static_df=None):
     )
     return ts_df
 
-def forecast(predictor: TimeSeriesPredictor, ts_df, known_covariates=None):
+def _ensemble_weights(predictor: TimeSeriesPredictor):
+    """
+    Возвращает веса базовых моделей лучшего ансамбля или None, если лучшая модель не ансамбль.
+    """
+    try:
+        best_model = predictor._trainer.load_model(predictor.model_best)
+    except Exception as e:
+        logging.warning(f"Не удалось загрузить лучшую модель для параллельного прогноза: {e}")
+        return None
+    weights = getattr(best_model, "model_to_weight", None)
+    if not weights or len(weights) < 2:
+        return None
+    return weights
+
+def _parallel_ensemble_predict(predictor: TimeSeriesPredictor, ts_df, known_covariates, weights, max_workers):
+    """
+    Прогнозирует базовыми моделями ансамбля параллельно и складывает прогнозы с весами ансамбля
+    (так же, как это делает WeightedEnsemble). Кэш прогнозов AutoGluon отключён,
+    чтобы параллельные вызовы не писали в один файл.
+    """
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(weights))) as pool:
+        futures = {
+            model_name: pool.submit(
+                predictor.predict, ts_df, known_covariates=known_covariates, model=model_name, use_cache=False
+            )
+            for model_name in weights
+        }
+        model_preds = {model_name: future.result() for model_name, future in futures.items()}
+    return reduce(operator.add, (model_preds[name] * weight for name, weight in weights.items()))
+
+def forecast(predictor: TimeSeriesPredictor, ts_df, known_covariates=None, max_workers=None):
     """
     Вызывает predictor.predict() и возвращает прогноз.
+    Только при max_workers > 1 (по умолчанию ENSEMBLE_PREDICT_WORKERS) и ансамбле в роли
+    лучшей модели базовые модели прогнозируют параллельно; если это падает с исключением,
+    используется обычный predict().
     """
     logging.info("Вызов predictor.predict()...")
-    preds = predictor.predict(ts_df, known_covariates=known_covariates)
+    if max_workers is None:
+        max_workers = ENSEMBLE_PREDICT_WORKERS
+    weights = _ensemble_weights(predictor) if max_workers > 1 else None
+    preds = None
+    if weights:
+        try:
+            preds = _parallel_ensemble_predict(predictor, ts_df, known_covariates, weights, max_workers)
+            logging.info(f"Ансамбль из {len(weights)} моделей спрогнозирован параллельно.")
+        except Exception as e:
+            logging.warning(f"Параллельный прогноз ансамбля не удался, используем predictor.predict(): {e}")
+            preds = None
+    if preds is None:
+        preds = predictor.predict(ts_df, known_covariates=known_covariates)
     logging.info("Прогнозирование завершено.")
     return preds
 
@@ -30,4 +86,3 @@ def forecast(predictor: TimeSeriesPredictor, ts_df, known_covariates=None):
 
 
 
-
@@ -6,8 +6,6 @@ from typing import Dict, Any, Optional
 import plotly.express as px
 import plotly.graph_objects as go
 import time
-import gc
-from collections import Counter
 
 def validate_dataset(df: pd.DataFrame, 
                     dt_col: str, 
@@ -26,14 +24,12 @@ def validate_dataset(df: pd.DataFrame,
     # Инициализируем outliers_count для безопасного использования в stats
     outliers_count = 0
     
-    # Проверка наличия обязательных колонок
-    required_cols = []
-    if dt_col and dt_col != "<нет>":
-        required_cols.append(dt_col)
-    if tgt_col and tgt_col != "<нет>":
-        required_cols.append(tgt_col)
-    if id_col and id_col != "<нет>":
-        required_cols.append(id_col)
+    # Проверка наличия обязательных колонок. Выбор колонок определяем один раз:
+    # после проверки ниже каждая выбранная колонка гарантированно есть в df
+    has_dt = bool(dt_col) and dt_col != "<нет>"
+    has_tgt = bool(tgt_col) and tgt_col != "<нет>"
+    has_id = bool(id_col) and id_col != "<нет>"
+    required_cols = [col for col, selected in ((dt_col, has_dt), (tgt_col, has_tgt), (id_col, has_id)) if selected]
     
     missing_cols = [col for col in required_cols if col not in df.columns]
     if missing_cols:
@@ -42,7 +38,7 @@ def validate_dataset(df: pd.DataFrame,
         return result
     
     # Проверка типа данных в колонке с датой
-    if dt_col and dt_col != "<нет>" and dt_col in df.columns:
+    if has_dt:
         if not pd.api.types.is_datetime64_any_dtype(df[dt_col]):
             try:
                 # Пытаемся преобразовать к datetime
@@ -53,25 +49,27 @@ def validate_dataset(df: pd.DataFrame,
                 return result
     
     # Проверка типа данных в колонке target
-    if tgt_col and tgt_col != "<нет>" and tgt_col in df.columns:
+    if has_tgt:
         if not pd.api.types.is_numeric_dtype(df[tgt_col]):
             result["is_valid"] = False
             result["errors"].append(f"Колонка {tgt_col} должна содержать числовые значения.")
             return result
     
     # Проверка на пропущенные значения
-    if dt_col and dt_col != "<нет>" and dt_col in df.columns:
+    missing_dt = 0
+    missing_tgt = 0
+    if has_dt:
         missing_dt = df[dt_col].isna().sum()
         if missing_dt > 0:
             result["warnings"].append(f"Колонка {dt_col} содержит {missing_dt} пропущенных значений.")
     
-    if tgt_col and tgt_col != "<нет>" and tgt_col in df.columns:
+    if has_tgt:
         missing_tgt = df[tgt_col].isna().sum()
         if missing_tgt > 0:
             result["warnings"].append(f"Колонка {tgt_col} содержит {missing_tgt} пропущенных значений ({missing_tgt/len(df)*100:.2f}%).")
     
     # Анализ аномалий в целевой переменной
-    if tgt_col and tgt_col != "<нет>" and tgt_col in df.columns:
+    if has_tgt:
         q1 = df[tgt_col].quantile(0.25)
         q3 = df[tgt_col].quantile(0.75)
         iqr = q3 - q1
@@ -85,8 +83,8 @@ def validate_dataset(df: pd.DataFrame,
             result["warnings"].append(f"Обнаружено {outliers_count} выбросов в колонке {tgt_col} ({outliers_count/len(df)*100:.2f}%).")
     
     # Проверка временного ряда на непрерывность (ОПТИМИЗИРОВАНО)
-    if dt_col and dt_col != "<нет>" and dt_col in df.columns and pd.api.types.is_datetime64_any_dtype(df[dt_col]):
-        if id_col and id_col != "<нет>" and id_col in df.columns:
+    if has_dt and pd.api.types.is_datetime64_any_dtype(df[dt_col]):
+        if has_id:
             logging.info("Начало проверки непрерывности временных рядов по ID...")
             start_time = time.time()
             df_sorted = df[[id_col, dt_col]].sort_values(by=[id_col, dt_col])
@@ -97,10 +95,10 @@ def validate_dataset(df: pd.DataFrame,
             valid_diffs = df_sorted['time_diff'].dropna()
 
             if not valid_diffs.empty:
-                # Находим наиболее частую разницу во времени (моду)
-                # Используем Counter для эффективности на больших данных
-                diff_counts = Counter(valid_diffs)
-                most_common_diff = diff_counts.most_common(1)[0][0]
+                # Находим наиболее частую разницу во времени (моду).
+                # value_counts считает по int64 без упаковки каждого значения в Timedelta;
+                # при равенстве побеждает интервал, встретившийся первым
+                most_common_diff = valid_diffs.value_counts(sort=False).idxmax()
                 logging.info("Наиболее частый интервал (частота): %s", most_common_diff)
 
                 # Находим пропуски - строки, где разница больше наиболее частой
@@ -121,8 +119,8 @@ def validate_dataset(df: pd.DataFrame,
             end_time = time.time()
             logging.info("Проверка непрерывности завершена за %.2f сек.", end_time - start_time)
             # Удаляем временную колонку и сортированный датафрейм для экономии памяти
+            # (циклических ссылок нет, память освобождается сразу по del — полный gc.collect() не нужен)
             del df_sorted
-            gc.collect()
         else:
             # Проверка непрерывности для одного временного ряда (без ID)
             logging.info("Начало проверки непрерывности одного временного ряда...")
@@ -131,8 +129,7 @@ def validate_dataset(df: pd.DataFrame,
             if len(df_sorted) > 1:
                 time_diffs = df_sorted[dt_col].diff().dropna()
                 if not time_diffs.empty:
-                    diff_counts = Counter(time_diffs)
-                    most_common_diff = diff_counts.most_common(1)[0][0]
+                    most_common_diff = time_diffs.value_counts(sort=False).idxmax()
                     logging.info("Наиболее частый интервал (частота): %s", most_common_diff)
                     tolerance = pd.Timedelta(seconds=1)
                     gaps = df_sorted[df_sorted[dt_col].diff() > (most_common_diff + tolerance)]
@@ -147,24 +144,23 @@ def validate_dataset(df: pd.DataFrame,
             end_time = time.time()
             logging.info("Проверка непрерывности одного ряда завершена за %.2f сек.", end_time - start_time)
             del df_sorted
-            gc.collect()
     
     # Рассчитываем и сохраняем статистики
     result["stats"] = {
         "rows_count": len(df),
-        "target_min": df[tgt_col].min() if tgt_col and tgt_col != "<нет>" and tgt_col in df.columns else None,
-        "target_max": df[tgt_col].max() if tgt_col and tgt_col != "<нет>" and tgt_col in df.columns else None,
-        "target_mean": df[tgt_col].mean() if tgt_col and tgt_col != "<нет>" and tgt_col in df.columns else None,
-        "target_median": df[tgt_col].median() if tgt_col and tgt_col != "<нет>" and tgt_col in df.columns else None,
-        "target_std": df[tgt_col].std() if tgt_col and tgt_col != "<нет>" and tgt_col in df.columns else None,
+        "target_min": df[tgt_col].min() if has_tgt else None,
+        "target_max": df[tgt_col].max() if has_tgt else None,
+        "target_mean": df[tgt_col].mean() if has_tgt else None,
+        "target_median": df[tgt_col].median() if has_tgt else None,
+        "target_std": df[tgt_col].std() if has_tgt else None,
         "missing_values": {
-            "dt_col": df[dt_col].isna().sum() if dt_col and dt_col != "<нет>" and dt_col in df.columns else 0,
-            "tgt_col": df[tgt_col].isna().sum() if tgt_col and tgt_col != "<нет>" and tgt_col in df.columns else 0
+            "dt_col": missing_dt,
+            "tgt_col": missing_tgt
         },
         "outliers_count": outliers_count if 'outliers_count' in locals() else 0
     }
     
-    if id_col and id_col != "<нет>" and id_col in df.columns:
+    if has_id:
         result["stats"]["unique_ids"] = df[id_col].nunique()
     
     return result
@@ -261,17 +257,21 @@ def plot_target_time_series(df: pd.DataFrame, dt_col: str, tgt_col: str, id_col:
     
     # Убеждаемся, что колонка даты в формате datetime
     if not pd.api.types.is_datetime64_any_dtype(df[dt_col]):
-        df = df.copy()
+        df = df.copy(deep=False)
         df[dt_col] = pd.to_datetime(df[dt_col], errors="coerce")
     
-    if id_col and id_col in df.columns and df[id_col].nunique() > 1:
+    # Один проход группировки вместо отдельных nunique() и groupby().count()
+    id_counts = df.groupby(id_col)[tgt_col].count() if id_col and id_col in df.columns else None
+    if id_counts is not None and len(id_counts) > 1:
         # Ограничиваем количество ID для читаемости
-        top_ids = df.groupby(id_col)[tgt_col].count().nlargest(5).index.tolist()
-        plot_df = df[df[id_col].isin(top_ids)].copy()
+        top_ids = id_counts.nlargest(5).index.tolist()
+        # Булева выборка уже даёт новый датафрейм, а px.line его только читает
+        plot_df = df[df[id_col].isin(top_ids)]
+        # WebGL вместо SVG: длинные ряды не раздувают DOM в браузере
         fig = px.line(plot_df, x=dt_col, y=tgt_col, color=id_col, 
-                     title=f"{title} (топ-5 по количеству точек)")
+                     title=f"{title} (топ-5 по количеству точек)", render_mode="webgl")
     else:
-        fig = px.line(df, x=dt_col, y=tgt_col, title=title)
+        fig = px.line(df, x=dt_col, y=tgt_col, title=title, render_mode="webgl")
     
     return fig
 
@@ -286,11 +286,11 @@ def analyze_seasonal_patterns(df: pd.DataFrame, dt_col: str, tgt_col: str, id_co
     
     # Убеждаемся, что колонка даты в формате datetime
     if not pd.api.types.is_datetime64_any_dtype(df[dt_col]):
-        df = df.copy()
+        df = df.copy(deep=False)
         df[dt_col] = pd.to_datetime(df[dt_col], errors="coerce")
     
-    # Добавляем временные компоненты
-    df_analysis = df.copy()
+    # Добавляем временные компоненты; копируем только дату и цель, остальные колонки не нужны
+    df_analysis = df[[dt_col, tgt_col]].copy()
     df_analysis['year'] = df_analysis[dt_col].dt.year
     df_analysis['month'] = df_analysis[dt_col].dt.month
     df_analysis['day'] = df_analysis[dt_col].dt.day
@@ -354,13 +354,14 @@ def detect_autocorrelation(df: pd.DataFrame, dt_col: str, tgt_col: str, id_col:
     
     # Убеждаемся, что колонка даты в формате datetime
     if not pd.api.types.is_datetime64_any_dtype(df[dt_col]):
-        df = df.copy()
+        df = df.copy(deep=False)
         df[dt_col] = pd.to_datetime(df[dt_col], errors="coerce")
     
     try:
-        if id_col and id_col in df.columns and df[id_col].nunique() > 1:
+        # Один проход группировки вместо отдельных nunique() и groupby().size()
+        id_counts = df.groupby(id_col).size() if id_col and id_col in df.columns else None
+        if id_counts is not None and len(id_counts) > 1:
             # Выбираем самый длинный временной ряд для анализа
-            id_counts = df.groupby(id_col).size()
             top_id = id_counts.idxmax()
             time_series = df[df[id_col] == top_id].sort_values(dt_col)[tgt_col].values
             results['analyzed_id'] = top_id
@@ -2,7 +2,6 @@ from fastapi import APIRouter, File, UploadFile, HTTPException, Depends, Form, B
 import pandas as pd
 import numpy as np
 import logging
-import gc
 import os
 import json
 import uuid
@@ -27,6 +26,7 @@ from sessions.utils import (
     get_model_path,
     training_sessions
 )
+from utils.excel_writer import write_excel
 
 # Global training status tracking
 
@@ -131,9 +131,10 @@ async def run_training_prediction_async(
 
 
         output = BytesIO()
-        preds.to_excel(output, index=False)
+        # Сборка xlsx и запись файла — вне event loop, как и сам прогноз
+        await asyncio.to_thread(write_excel, preds, output, index=False)
         output.seek(0)
-        save_prediction(output, session_id)
+        await asyncio.to_thread(save_prediction, output, session_id)
 
         for col in [str(round(x/10, 1)) for x in range(1, 10)]:
             if col in preds.columns:
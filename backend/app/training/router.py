@@ -2,7 +2,6 @@ from fastapi import APIRouter, File, UploadFile, HTTPException, Depends, Form, B
 import pandas as pd
 import numpy as np
 import logging
-import gc
 import os
 import json
 import uuid
@@ -18,10 +17,9 @@ from db.settings import settings as db_settings
 from fastapi.security import OAuth2PasswordBearer
 from typing import Optional
 import pandas as modin_pd
-from autogluon.timeseries import TimeSeriesPredictor
 from .model import TrainingParameters
 from src.features.feature_engineering import add_russian_holiday_feature, fill_missing_values
-from src.data.data_processing import convert_to_timeseries, safely_prepare_timeseries_data
+from src.data.data_processing import convert_to_timeseries, first_rows_by_id, safely_prepare_timeseries_data
 from src.models.forecasting import make_timeseries_dataframe
 from src.validation.data_validation import validate_dataset
 from sessions.utils import (
@@ -34,6 +32,7 @@ from sessions.utils import (
     get_model_path,
     training_sessions
 )
+from utils.excel_reader import read_excel
 
 # Global training status tracking
 
@@ -50,7 +49,9 @@ def get_training_status(session_id: str) -> Optional[Dict]:
         if metadata:
             training_sessions[session_id] = metadata  # обновляем кэш, если нужно
         return metadata
-    except:
+    except (OSError, ValueError) as e:
+        # Повреждённый или недоступный metadata.json; JSONDecodeError — подкласс ValueError
+        logging.warning(f"[get_training_status] Не удалось прочитать metadata.json для {session_id}: {e}", exc_info=True)
         return None
 
 async def run_training_async(
@@ -175,8 +176,8 @@ def fill_to_frequency(df: pd.DataFrame, training_params: TrainingParameters, ses
     naive_forecasts = []
     # Если нет группировки по id, просто по всему датафрейму
     if id_col not in df.columns:
-        df = df.copy()
-        df[dt_col] = pd.to_datetime(df[dt_col])
+        if not pd.api.types.is_datetime64_any_dtype(df[dt_col]):
+            df = df.assign(**{dt_col: pd.to_datetime(df[dt_col])})
         full_range = pd.date_range(df[dt_col].min(), df[dt_col].max(), freq=freq_short)
         
         if len(full_range) > len(df):
@@ -196,19 +197,27 @@ def fill_to_frequency(df: pd.DataFrame, training_params: TrainingParameters, ses
                 future_dates = pd.date_range(last_date, periods=prediction_length+1, freq=freq_short)[1:]
                 naive_df = pd.DataFrame({
                     dt_col: future_dates,
-                    tgt_col: [last_value]*prediction_length
+                    tgt_col: last_value
                 })
                 naive_forecasts.append(naive_df)
             df = df.iloc[0:0]  # полностью исключаем из обучения
     else:
         dfs = []
+        # Даты парсим один раз для всего датафрейма, а не в каждой группе
+        if not pd.api.types.is_datetime64_any_dtype(df[dt_col]):
+            df = df.assign(**{dt_col: pd.to_datetime(df[dt_col])})
+        reindexed_cols = [dt_col] + [col for col in df.columns if col != dt_col]
         for unique_id, group in df.groupby(id_col):
-            group = group.copy()
-            group[dt_col] = pd.to_datetime(group[dt_col])
-            full_range = pd.date_range(group[dt_col].min(), group[dt_col].max(), freq=freq_short)
+            dates = group[dt_col]
+            full_range = pd.date_range(dates.min(), dates.max(), freq=freq_short)
             was_extended = len(full_range) > len(group)
-            group = group.set_index(dt_col).reindex(full_range).rename_axis(dt_col).reset_index()
-            group[id_col] = unique_id
+            if (len(full_range) == len(group) and dates.is_monotonic_increasing
+                    and (dates.to_numpy() == full_range.to_numpy()).all()):
+                # Ряд уже лежит на сетке частоты — reindex ничего не изменит
+                group = group[reindexed_cols].reset_index(drop=True)
+            else:
+                group = group.set_index(dt_col).reindex(full_range).rename_axis(dt_col).reset_index()
+                group[id_col] = unique_id
             group[tgt_col] = group[tgt_col].ffill()
             # Проверка на минимальное количество данных для каждого ряда
             if len(group) < min_required:
@@ -218,9 +227,10 @@ def fill_to_frequency(df: pd.DataFrame, training_params: TrainingParameters, ses
                     last_value = group[tgt_col].iloc[-1]
                     future_dates = pd.date_range(last_date, periods=prediction_length+1, freq=freq_short)[1:]
                     naive_df = pd.DataFrame({
+                        # Скаляры pandas растягивает на длину future_dates без промежуточных списков
                         dt_col: future_dates,
-                        tgt_col: [last_value]*prediction_length,
-                        id_col: [unique_id]*prediction_length
+                        tgt_col: last_value,
+                        id_col: unique_id
                     })
                     naive_forecasts.append(naive_df)
                 continue  # не добавляем в dfs, исключаем из обучения
@@ -282,8 +292,13 @@ def train_model(
         
         logging.info(f"[train_model] Начало подготовки данных для session_id={session_id}")
         # 3. Data Preparation
-        df2 = df_train.copy()
-        df2[training_params.datetime_column] = pd.to_datetime(df2[training_params.datetime_column], errors="coerce")
+        # Поверхностная копия: дальше колонки только заменяются целиком,
+        # поэтому полное копирование df_train лишь удваивает пик памяти
+        df2 = df_train.copy(deep=False)
+        dt_col = training_params.datetime_column
+        # Дату разбираем один раз здесь; праздники и fill_to_frequency дальше её не трогают
+        if not pd.api.types.is_datetime64_any_dtype(df2[dt_col]):
+            df2[dt_col] = pd.to_datetime(df2[dt_col], errors="coerce")
         status.update({"progress": text_to_progress['preparation']}) 
         logging.info(f"[train_model] Progress updated to {text_to_progress['preparation']} (preparation)")
         save_session_metadata(session_id, status)
@@ -296,7 +311,7 @@ def train_model(
             # static_cols: список названий статических признаков
             static_cols = [col for col in static_cols if col in df2.columns and col != id_col]
             if static_cols:
-                static_df = df2[[id_col] + static_cols].drop_duplicates(subset=[id_col])
+                static_df = first_rows_by_id(df2, id_col, [id_col] + static_cols)
                 session_path = get_session_path(session_id)
                 static_path = os.path.join(session_path, 'static_data.parquet')
                 static_df.to_parquet(static_path, index=False)
@@ -310,22 +325,24 @@ def train_model(
                 holiday_col="russian_holiday"
             )
             logging.info(f"[train_model] Добавлен признак российских праздников.")
-        status.update({"progress": text_to_progress['holidays']})
-        logging.info(f"[train_model] Progress updated to {text_to_progress['holidays']} (holidays)")
-        save_session_metadata(session_id, status)
-        training_sessions[session_id] = status  # обновляем кэш
+            # Прогресс сохраняем только для реально выполненных этапов
+            status.update({"progress": text_to_progress['holidays']})
+            logging.info(f"[train_model] Progress updated to {text_to_progress['holidays']} (holidays)")
+            save_session_metadata(session_id, status)
+            training_sessions[session_id] = status  # обновляем кэш
 
         # Fill missing values (custom logic)
-        df2 = fill_missing_values(
-            df2,
-            training_params.fill_missing_method,
-            training_params.fill_group_columns
-        )
-        logging.info(f"[train_model] Пропущенные значения обработаны методом: {training_params.fill_missing_method}")
-        status.update({"progress": text_to_progress['missings']})
-        logging.info(f"[train_model] Progress updated to {text_to_progress['missings']} (missings)")
-        save_session_metadata(session_id, status)
-        training_sessions[session_id] = status  # обновляем кэш
+        if training_params.fill_missing_method and training_params.fill_missing_method != "None":
+            df2 = fill_missing_values(
+                df2,
+                training_params.fill_missing_method,
+                training_params.fill_group_columns
+            )
+            logging.info(f"[train_model] Пропущенные значения обработаны методом: {training_params.fill_missing_method}")
+            status.update({"progress": text_to_progress['missings']})
+            logging.info(f"[train_model] Progress updated to {text_to_progress['missings']} (missings)")
+            save_session_metadata(session_id, status)
+            training_sessions[session_id] = status  # обновляем кэш
 
         # Универсальное дополнение до нужной частоты + запись messages
         df2 = fill_to_frequency(df2, training_params, session_id=session_id)
@@ -336,12 +353,13 @@ def train_model(
         if status is None:
             status = training_sessions[session_id]
         
-        status.update({"progress": text_to_progress['dataframe']})
-        logging.info(f"[train_model] Progress updated to {text_to_progress['dataframe']} (dataframe)")
-        save_session_metadata(session_id, status)
-        training_sessions[session_id] = status  # обновляем кэш
-
-        if len(df2) != 0:
+        if len(df2) == 0:
+            # Обучения не будет — фиксируем этап подготовки; иначе сразу пишется этап training
+            status.update({"progress": text_to_progress['dataframe']})
+            logging.info(f"[train_model] Progress updated to {text_to_progress['dataframe']} (dataframe)")
+            save_session_metadata(session_id, status)
+            training_sessions[session_id] = status  # обновляем кэш
+        else:
             status.update({"progress": text_to_progress['training']})
             logging.info(f"[train_model] Progress updated to {text_to_progress['training']} (training)")
             save_session_metadata(session_id, status)
@@ -356,8 +374,6 @@ def train_model(
         session_path = get_session_path(session_id)
         combined_leaderboard = automl_manager.combine_leaderboards(session_id, [strategy.name for strategy in automl_manager.get_strategies()])
         combined_leaderboard.to_csv(os.path.join(session_path, 'leaderboard.csv'), index=False)
-        gc.collect()
-        logging.info(f"[train_model] Очистка памяти завершена.")
 
     except Exception as e:
         logging.error(f"[train_model] Ошибка в процессе обучения: {e}", exc_info=True)
@@ -540,7 +556,7 @@ async def prepare_training_data_and_status(
             if filename.endswith('.csv'):
                 return modin_pd.read_csv(stream)
             else:
-                return modin_pd.read_excel(stream)
+                return read_excel(stream)
         df_train = await asyncio.to_thread(read_data_from_stream, file_like_object, training_file.filename)
         file_like_object.close()
         # Сохраняем оригинальный датасет в parquet с фиксированным именем original_file.parquet
@@ -0,0 +1,81 @@
+import logging
+from datetime import date, timedelta
+
+import pandas as pd
+
+try:
+    import python_calamine
+    CALAMINE_AVAILABLE = True
+except ImportError:
+    CALAMINE_AVAILABLE = False
+
+# engine="calamine" поддерживается в pandas начиная с 2.2; на более старых версиях
+# читаем через _CalamineReader — перенос читателя calamine из pandas 2.2
+_PANDAS_VERSION = tuple(int(part) for part in pd.__version__.split(".")[:2])
+EXCEL_ENGINE = "calamine" if CALAMINE_AVAILABLE and _PANDAS_VERSION >= (2, 2) else None
+
+if not CALAMINE_AVAILABLE:
+    logging.info("python-calamine не установлен, Excel читается через openpyxl")
+
+
+if CALAMINE_AVAILABLE and EXCEL_ENGINE is None:
+    from pandas.io.excel._base import BaseExcelReader
+
+    class _CalamineReader(BaseExcelReader):
+        """
+        Читатель Excel на python-calamine для pandas < 2.2 — тот же, что engine="calamine"
+        в pandas 2.2. Заголовки, nrows и вывод типов делает общий BaseExcelReader.parse.
+        """
+
+        @property
+        def _workbook_class(self):
+            return python_calamine.CalamineWorkbook
+
+        def load_workbook(self, filepath_or_buffer, engine_kwargs):
+            return python_calamine.load_workbook(filepath_or_buffer, **engine_kwargs)
+
+        @property
+        def sheet_names(self):
+            return [
+                sheet.name for sheet in self.book.sheets_metadata
+                if sheet.typ == python_calamine.SheetTypeEnum.WorkSheet
+            ]
+
+        def get_sheet_by_name(self, name):
+            self.raise_if_bad_sheet_by_name(name)
+            return self.book.get_sheet_by_name(name)
+
+        def get_sheet_by_index(self, index):
+            self.raise_if_bad_sheet_by_index(index)
+            return self.book.get_sheet_by_index(index)
+
+        def get_sheet_data(self, sheet, file_rows_needed=None):
+            def _convert_cell(value):
+                # Целые числа в Excel хранятся как float — возвращаем int, как openpyxl
+                if isinstance(value, float):
+                    as_int = int(value)
+                    return as_int if as_int == value else value
+                if isinstance(value, date):
+                    return pd.Timestamp(value)
+                if isinstance(value, timedelta):
+                    return pd.Timedelta(value)
+                return value
+
+            rows = sheet.to_python(skip_empty_area=False, nrows=file_rows_needed)
+            return [[_convert_cell(cell) for cell in row] for row in rows]
+
+
+def read_excel(io, **kwargs) -> pd.DataFrame:
+    """
+    pd.read_excel с быстрым движком calamine (Rust), если он доступен.
+    Явно переданный engine не переопределяется.
+    """
+    if "engine" in kwargs or not CALAMINE_AVAILABLE:
+        return pd.read_excel(io, **kwargs)
+    if EXCEL_ENGINE:
+        return pd.read_excel(io, engine=EXCEL_ENGINE, **kwargs)
+    reader = _CalamineReader(io)
+    try:
+        return reader.parse(**kwargs)
+    finally:
+        reader.close()
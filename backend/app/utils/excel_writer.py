@@ -0,0 +1,298 @@
+import re
+import zipfile
+from xml.sax.saxutils import escape, quoteattr
+
+import numpy as np
+import pandas as pd
+
+# По умолчанию xlsxwriter проверяет каждую строковую ячейку регулярным выражением URL
+# и превращает похожие строки в гиперссылки — для выгрузки данных это лишняя работа.
+# constant_memory не включаем: pandas пишет ячейки по колонкам, а в этом режиме
+# xlsxwriter принимает только запись по строкам и теряет уже пройденные ячейки.
+XLSXWRITER_OPTIONS = {"strings_to_urls": False}
+
+# Тот же стиль заголовка, что у DataFrame.to_excel
+HEADER_FORMAT = {"bold": True, "border": 1, "align": "center", "valign": "top"}
+# Подсветка лучшей модели в leaderboard отчётов
+BEST_MODEL_FORMAT = {"bg_color": "#C6EFCE", "font_color": "#006100"}
+
+# Начиная с этого размера одиночный лист пишется напрямую в XML (см. _write_fast_xlsx)
+FAST_XLSX_MIN_ROWS = 50_000
+_FAST_XLSX_CHUNK_ROWS = 10_000
+_EXCEL_MAX_ROWS = 1_048_576
+_EXCEL_MAX_STRING_LEN = 32_767
+# Даты раньше 1900-03-01 xlsxwriter пересчитывает с поправками (1900-01-01, ложный
+# 29 февраля 1900) — такие колонки оставляем pandas
+_EXCEL_EPOCH_US = np.datetime64("1899-12-31", "us").astype(np.int64)
+_EXCEL_MIN_DATETIME = np.datetime64("1900-03-01", "ns")
+_US_PER_DAY = 86_400_000_000
+# Управляющие символы недопустимы в XML; Excel хранит их как _xHHHH_
+_XML_CONTROL_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_XLSX_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+        '</Relationships>'
+    ),
+    # Стиль 0 — обычная ячейка, стиль 1 — заголовок как у to_excel (жирный, рамка, по центру)
+    "xl/styles.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<fonts count="2">'
+        '<font><sz val="11"/><name val="Calibri"/><family val="2"/></font>'
+        '<font><b/><sz val="11"/><name val="Calibri"/><family val="2"/></font>'
+        '</fonts>'
+        '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+        '<borders count="2">'
+        '<border><left/><right/><top/><bottom/><diagonal/></border>'
+        '<border><left style="thin"><color auto="1"/></left><right style="thin"><color auto="1"/></right>'
+        '<top style="thin"><color auto="1"/></top><bottom style="thin"><color auto="1"/></bottom><diagonal/></border>'
+        '</borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="2">'
+        '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<xf numFmtId="0" fontId="1" fillId="0" borderId="1" xfId="0" applyFont="1" applyBorder="1" applyAlignment="1">'
+        '<alignment horizontal="center" vertical="top"/></xf>'
+        '</cellXfs>'
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        '</styleSheet>'
+    ),
+}
+
+
+def excel_writer(path_or_buffer) -> pd.ExcelWriter:
+    """
+    pd.ExcelWriter на движке xlsxwriter с настройками для выгрузки данных.
+    """
+    return pd.ExcelWriter(path_or_buffer, engine="xlsxwriter", engine_kwargs={"options": XLSXWRITER_OPTIONS})
+
+
+def _row_writable(df: pd.DataFrame) -> bool:
+    """
+    True, если датафрейм можно записать построчно без форматирования pandas:
+    простой заголовок и только числовые, булевы, строковые колонки или даты без часового пояса.
+    """
+    if isinstance(df.columns, pd.MultiIndex):
+        return False
+    for _, col in df.items():
+        kind = col.dtype.kind if isinstance(col.dtype, np.dtype) else None
+        if kind in ("b", "i", "u", "f"):
+            continue
+        if kind == "M" and not (col.min() < _EXCEL_MIN_DATETIME):
+            continue
+        if kind == "O" and pd.api.types.infer_dtype(col, skipna=True) in ("string", "empty"):
+            continue
+        return False
+    return True
+
+
+def _column_values(col: pd.Series) -> list:
+    """
+    Значения колонки как список Python-объектов: пропуски — None (пустая ячейка),
+    бесконечности — "inf"/"-inf", как inf_rep в to_excel.
+    """
+    values = col.tolist()
+    missing = col.isna().to_numpy()
+    if col.dtype.kind == "f":
+        arr = col.to_numpy()
+        for i in np.flatnonzero(np.isinf(arr)):
+            values[i] = "inf" if arr[i] > 0 else "-inf"
+    for i in np.flatnonzero(missing):
+        values[i] = None
+    return values
+
+
+def _excel_serials(col: pd.Series) -> list:
+    """
+    Даты колонки как серийные числа Excel — та же арифметика, что в xlsxwriter
+    (с точностью до микросекунд, как datetime). NaT — None.
+    Колонка может быть в любых единицах (s, ms, us, ns): сначала приводим к микросекундам.
+    """
+    us = col.to_numpy().astype("datetime64[us]").view(np.int64) - _EXCEL_EPOCH_US
+    days, rem = np.divmod(us, _US_PER_DAY)
+    seconds, micros = np.divmod(rem, 1_000_000)
+    # +1 — ложный 29 февраля 1900 года в Excel
+    serials = days + (seconds.astype(np.float64) + micros / 1e6) / 86_400 + 1
+    values = serials.tolist()
+    for i in np.flatnonzero(col.isna().to_numpy()):
+        values[i] = None
+    return values
+
+
+def write_frame(writer: pd.ExcelWriter, df: pd.DataFrame, sheet_name: str = "Sheet1") -> None:
+    """
+    Записывает df без индекса на лист sheet_name открытого excel_writer.
+    Простые датафреймы пишутся построчно через write_row — без объекта-ячейки pandas
+    на каждое значение; остальные — обычным to_excel.
+    """
+    if not _row_writable(df):
+        df.to_excel(writer, sheet_name=sheet_name, index=False)
+        return
+    worksheet = writer.book.add_worksheet(sheet_name)
+    worksheet.write_row(0, 0, list(df.columns), writer.book.add_format(HEADER_FORMAT))
+    write_row = worksheet.write_row
+    date_cols = [idx for idx, (_, col) in enumerate(df.items()) if col.dtype.kind == "M"]
+    # Колонки дат в строках пропускаем (None не пишется) и дописываем ниже целиком с форматом
+    blank = [None] * len(df)
+    columns = [blank if col.dtype.kind == "M" else _column_values(col) for _, col in df.items()]
+    for row_idx, row in enumerate(zip(*columns), start=1):
+        write_row(row_idx, 0, row)
+    if date_cols:
+        # Формат дат тот же, что ставит to_excel (ExcelWriter.datetime_format)
+        date_format = writer.book.add_format({"num_format": writer.datetime_format})
+        write_number = worksheet.write_number
+        for idx in date_cols:
+            for row_idx, serial in enumerate(_excel_serials(df.iloc[:, idx]), start=1):
+                # NaT, как и в to_excel, — ячейка не пишется вовсе
+                if serial is not None:
+                    write_number(row_idx, idx, serial, date_format)
+
+
+def _plain_value(value):
+    """
+    Значение для write_row, как его записал бы to_excel: пропуск — пустая ячейка,
+    числа и bool как есть, всё прочее (списки, словари) — str().
+    """
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return "inf" if value == np.inf else "-inf" if value == -np.inf else float(value)
+    return value if isinstance(value, str) else str(value)
+
+
+def write_rows(writer: pd.ExcelWriter, sheet_name: str, header, rows) -> None:
+    """
+    Записывает небольшую таблицу (пары ключ-значение, сообщения) на лист sheet_name
+    прямо из итерируемого rows, без промежуточного DataFrame.
+    """
+    worksheet = writer.book.add_worksheet(sheet_name)
+    worksheet.write_row(0, 0, list(header), writer.book.add_format(HEADER_FORMAT))
+    for row_idx, row in enumerate(rows, start=1):
+        worksheet.write_row(row_idx, 0, [_plain_value(value) for value in row])
+
+
+def _fast_xlsx_supported(df: pd.DataFrame, sheet_name: str) -> bool:
+    """
+    True, если лист можно записать напрямую в XML с тем же результатом, что и через xlsxwriter:
+    допустимое имя листа, строки без формул (начинаются с "=") и не длиннее лимита Excel,
+    число строк в пределах листа. Иначе пишет xlsxwriter (и сам сообщает об ошибках).
+    """
+    name = str(sheet_name)
+    if not 0 < len(name) <= 31 or any(ch in name for ch in "[]:*?/\\") or name[0] == "'" or name[-1] == "'":
+        return False
+    if len(df) + 1 > _EXCEL_MAX_ROWS or not _row_writable(df):
+        return False
+    for _, col in df.items():
+        if col.dtype.kind == "M":
+            return False
+        if col.dtype.kind == "O":
+            strings = col.dropna()
+            if strings.str.startswith("=").any() or strings.str.len().max() > _EXCEL_MAX_STRING_LEN:
+                return False
+    return True
+
+
+def _xml_text(value: str) -> str:
+    return _XML_CONTROL_CHARS.sub(lambda m: "_x%04X_" % ord(m.group()), escape(value))
+
+
+def _cell_xml(value, style: str = "") -> str:
+    """
+    XML одной ячейки без адреса (ячейки в строке идут подряд). None — пустая ячейка.
+    """
+    if value is None or value == "":
+        # Пустую строку xlsxwriter тоже не записывает
+        return "<c/>"
+    if isinstance(value, str):
+        return f'<c{style} t="inlineStr"><is><t xml:space="preserve">{_xml_text(value)}</t></is></c>'
+    if isinstance(value, (bool, np.bool_)):
+        return f'<c{style} t="b"><v>{int(value)}</v></c>'
+    # repr Python-числа — кратчайшая точная запись; numpy-скаляры приводим явно
+    number = int(value) if isinstance(value, (int, np.integer)) else float(value)
+    return f"<c{style}><v>{number!r}</v></c>"
+
+
+def _column_cells(col: pd.Series) -> list:
+    """
+    XML ячеек колонки. Строковые колонки обрабатываются по уникальным значениям.
+    """
+    if col.dtype.kind == "O":
+        codes, uniques = pd.factorize(col)
+        cells = np.array([_cell_xml(value) for value in uniques] + ["<c/>"], dtype=object)
+        return cells[codes].tolist()
+    return [_cell_xml(value) for value in _column_values(col)]
+
+
+def _write_fast_xlsx(df: pd.DataFrame, path_or_buffer, sheet_name: str = "Sheet1") -> None:
+    """
+    Записывает один лист xlsx, формируя XML листа напрямую и упаковывая его в zip.
+    Для больших выгрузок в несколько раз быстрее xlsxwriter: нет объекта на ячейку
+    и общей таблицы строк, строки пишутся inline.
+    """
+    columns = [_column_cells(col) for _, col in df.items()]
+    workbook_xml = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f'<sheets><sheet name={quoteattr(str(sheet_name))} sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    )
+    with zipfile.ZipFile(path_or_buffer, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+        for name, content in _XLSX_PARTS.items():
+            archive.writestr(name, content)
+        archive.writestr("xl/workbook.xml", workbook_xml)
+        with archive.open("xl/worksheets/sheet1.xml", "w") as sheet:
+            header = "".join(_cell_xml(name, ' s="1"') for name in df.columns)
+            sheet.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+                f'<row r="1">{header}</row>'
+            ).encode("utf-8"))
+            rows = zip(*columns)
+            for start in range(0, len(df), _FAST_XLSX_CHUNK_ROWS):
+                end = min(start + _FAST_XLSX_CHUNK_ROWS, len(df))
+                chunk = "".join(
+                    f'<row r="{row_idx}">{"".join(next(rows))}</row>' for row_idx in range(start + 2, end + 2)
+                )
+                sheet.write(chunk.encode("utf-8"))
+            sheet.write(b"</sheetData></worksheet>")
+
+
+def write_excel(df: pd.DataFrame, path_or_buffer, **kwargs) -> None:
+    """
+    Записывает один датафрейм в xlsx через excel_writer.
+    Большие простые листы (от FAST_XLSX_MIN_ROWS строк) пишутся напрямую в XML.
+    """
+    simple = kwargs.get("index", True) is False and set(kwargs) <= {"index", "sheet_name"}
+    sheet_name = kwargs.get("sheet_name", "Sheet1")
+    if simple and len(df) >= FAST_XLSX_MIN_ROWS and _fast_xlsx_supported(df, sheet_name):
+        _write_fast_xlsx(df, path_or_buffer, sheet_name)
+        return
+    with excel_writer(path_or_buffer) as writer:
+        if simple:
+            write_frame(writer, df, sheet_name)
+        else:
+            df.to_excel(writer, **kwargs)
@@ -0,0 +1,92 @@
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+import pandas as pd
+import pytest
+
+from backend.app.src.data.data_processing import (
+    build_static_features,
+    convert_to_timeseries,
+    detect_outliers,
+    downcast_numeric,
+    first_rows_by_id,
+    is_sorted_by,
+)
+
+
+# --- first_rows_by_id ---
+def test_first_rows_by_id_matches_drop_duplicates():
+    df = pd.DataFrame(
+        {"id": ["b", "a", "b", None, "a", None], "static": [1, 2, 3, 4, 5, 6], "value": range(6)},
+        index=[10, 11, 12, 13, 14, 15],
+    )
+    result = first_rows_by_id(df, "id", ["id", "static"])
+    expected = df[["id", "static"]].drop_duplicates(subset=["id"])
+    pd.testing.assert_frame_equal(result, expected)
+
+
+# --- downcast_numeric ---
+def test_downcast_numeric_skips_excluded_columns():
+    df = pd.DataFrame({"id": [1, 2, 3], "qty": [1, 2, 3], "price": [1.5, 2.5, 3.5]})
+    result = downcast_numeric(df, exclude=("id",))
+    assert result["id"].dtype == "int64"
+    assert result["qty"].dtype == "int8"
+    # float64 не понижается: float32 исказил бы значения
+    assert result["price"].dtype == "float64"
+
+
+# --- build_static_features ---
+def test_build_static_features_renames_id_column():
+    df = pd.DataFrame({"shop": ["a", "b", "a"], "region": ["n", "s", "n"], "value": [1, 2, 3]})
+    static_df = build_static_features(df, "shop", ["region"])
+    assert list(static_df.columns) == ["item_id", "region"]
+    assert static_df["item_id"].tolist() == ["a", "b"]
+    assert build_static_features(df, "shop", []) is None
+
+
+# --- convert_to_timeseries ---
+def test_convert_to_timeseries_casts_object_target_to_float():
+    df = pd.DataFrame({
+        "shop": ["a", "a"],
+        "date": pd.to_datetime(["2024-01-02", "2024-01-01"]),
+        "sales": [None, 5],
+    })
+    result = convert_to_timeseries(df, "shop", "date", "sales")
+    assert result["target"].dtype == "float64"
+    assert result["target"].isna().tolist() == [False, True]
+
+
+def test_convert_to_timeseries_rejects_malformed_target_strings():
+    df = pd.DataFrame({
+        "shop": ["a", "a", "a"],
+        "date": pd.to_datetime(["2024-01-01", "2024-01-02", "2024-01-03"]),
+        "sales": ["1,5", None, "n/a"],
+    })
+    with pytest.raises(ValueError, match="нечисловые значения.*'1,5'.*'n/a'"):
+        convert_to_timeseries(df, "shop", "date", "sales")
+
+
+def test_convert_to_timeseries_sorts_by_item_and_timestamp():
+    df = pd.DataFrame({
+        "shop": ["b", "a", "a"],
+        "date": pd.to_datetime(["2024-01-01", "2024-01-02", "2024-01-01"]),
+        "sales": [1.0, 2.0, 3.0],
+    }, index=[7, 8, 9])
+    result = convert_to_timeseries(df, "shop", "date", "sales")
+    assert result["target"].tolist() == [3.0, 2.0, 1.0]
+    assert list(result.index) == [0, 1, 2]
+    assert is_sorted_by(result, ["item_id", "timestamp"])
+    # Исходный датафрейм не меняется
+    assert list(df.columns) == ["shop", "date", "sales"]
+
+
+# --- detect_outliers ---
+def test_detect_outliers_iqr_per_id():
+    df = pd.DataFrame({
+        "shop": ["b", "a", "b", "a", "b", "a", "b", "a", "a"],
+        "sales": [1.0, 10.0, 2.0, 11.0, 100.0, 12.0, 3.0, 500.0, 13.0],
+    })
+    clean, outliers = detect_outliers(df, "sales", "shop", method="iqr")
+    # Порядок выбросов: сначала ID, появившийся первым
+    assert outliers["sales"].tolist() == [100.0, 500.0]
+    assert list(clean.index) == [0, 1, 2, 3, 5, 6, 8]
@@ -0,0 +1,35 @@
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.app.utils import excel_reader
+from backend.app.utils.excel_reader import read_excel
+
+
+@pytest.fixture
+def xlsx_bytes():
+    df = pd.DataFrame({
+        "Shop": ["a", None, "b", "c"],
+        "Date": pd.to_datetime(["2024-01-01 00:00", "2024-01-02 10:30", None, "2024-01-04 00:00"]),
+        "Target": [1.0, 2.5, np.nan, 4.0],
+        "Count": [1, 2, 3, 4],
+        "Flag": [True, False, True, False],
+    })
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
+        df.to_excel(writer, index=False)
+    return output.getvalue()
+
+
+# --- read_excel ---
+@pytest.mark.skipif(not excel_reader.CALAMINE_AVAILABLE, reason="python-calamine не установлен")
+@pytest.mark.parametrize("kwargs", [{}, {"nrows": 2}])
+def test_read_excel_calamine_matches_openpyxl(xlsx_bytes, kwargs):
+    expected = pd.read_excel(BytesIO(xlsx_bytes), engine="openpyxl", **kwargs)
+    result = read_excel(BytesIO(xlsx_bytes), **kwargs)
+    pd.testing.assert_frame_equal(result, expected)
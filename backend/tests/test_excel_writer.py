@@ -0,0 +1,113 @@
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+import zipfile
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+from backend.app.utils import excel_writer as excel_writer_module
+from backend.app.utils.excel_writer import excel_writer, write_excel, write_frame, write_rows
+
+
+def _to_excel_bytes(df):
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
+        df.to_excel(writer, index=False)
+    return output
+
+
+# --- write_excel ---
+def test_write_excel_matches_to_excel():
+    df = pd.DataFrame({
+        "shop": ["a", None, "http://example.com"],
+        "date": ["2024-01-01 00:00:00", "2024-01-02 00:00:00", "2024-01-03 00:00:00"],
+        "0.5": [1.5, np.nan, np.inf],
+        "count": [1, 2, 3],
+        "flag": [True, False, True],
+    })
+    output = BytesIO()
+    write_excel(df, output, index=False)
+
+    expected = pd.read_excel(_to_excel_bytes(df))
+    result = pd.read_excel(output)
+    pd.testing.assert_frame_equal(result, expected)
+
+    # Заголовок оформлен так же, как у to_excel, URL не превращается в гиперссылку
+    ws = load_workbook(output).active
+    assert ws["A1"].font.b and ws["A1"].border.left.style == "thin"
+    assert ws["A1"].alignment.horizontal == "center"
+    assert ws["A4"].hyperlink is None
+
+
+def test_write_excel_fast_xml_path_matches_to_excel(monkeypatch):
+    monkeypatch.setattr(excel_writer_module, "FAST_XLSX_MIN_ROWS", 0)
+    df = pd.DataFrame({
+        "shop": ["a & <b>", "", None, "x\x01y"],
+        "0.5": [1e-300, np.nan, -np.inf, 2.5],
+        "count": [1, -2, 3, 4],
+        "flag": [True, False, True, False],
+    })
+    output = BytesIO()
+    write_excel(df, output, index=False)
+
+    expected = pd.read_excel(_to_excel_bytes(df))
+    result = pd.read_excel(output)
+    pd.testing.assert_frame_equal(result, expected)
+    ws = load_workbook(output).active
+    assert ws["B1"].font.b and ws["B1"].border.bottom.style == "thin"
+
+
+# --- write_frame ---
+def _assert_write_frame_matches_to_excel(df):
+    output = BytesIO()
+    with excel_writer(output) as writer:
+        write_frame(writer, df, "Prediction")
+    expected = BytesIO()
+    with pd.ExcelWriter(expected, engine="xlsxwriter") as writer:
+        df.to_excel(writer, sheet_name="Prediction", index=False)
+    for part in ("xl/worksheets/sheet1.xml", "xl/styles.xml"):
+        assert zipfile.ZipFile(output).read(part) == zipfile.ZipFile(expected).read(part)
+
+
+def test_write_frame_writes_datetimes_like_to_excel():
+    # Те же серийные числа, формат даты и пропуск NaT, что у to_excel
+    _assert_write_frame_matches_to_excel(pd.DataFrame({
+        "date": pd.to_datetime(["2024-01-01 10:20:30.123456789", None, "1950-06-01 23:59:59.999999"], format="mixed"),
+        "value": [1.5, 2.5, 3.5],
+    }))
+
+
+@pytest.mark.parametrize("unit", ["s", "ms", "us"])
+def test_write_frame_writes_non_ns_datetimes_like_to_excel(unit):
+    dates = pd.Series(pd.to_datetime(["2024-01-01 10:20:30", None, "1950-06-01 00:00:00"])).dt.as_unit(unit)
+    _assert_write_frame_matches_to_excel(pd.DataFrame({"date": dates, "value": [1.5, 2.5, 3.5]}))
+
+
+def test_write_frame_falls_back_for_dates_before_march_1900():
+    _assert_write_frame_matches_to_excel(pd.DataFrame({
+        "date": pd.to_datetime(["1900-01-01", "2024-01-02"]),
+        "value": [1.5, 2.5],
+    }))
+
+
+# --- write_rows ---
+def test_write_rows_matches_to_excel():
+    params = {"prediction_length": 10, "models": ["DeepAR", "ETS"], "use_holidays": True,
+              "freq": "D", "static": None, "quantile": 0.5, "config": {"a": 1}}
+    output = BytesIO()
+    with excel_writer(output) as writer:
+        write_rows(writer, "TrainingParams", ["Parameter", "Value"], params.items())
+    expected_output = BytesIO()
+    with pd.ExcelWriter(expected_output, engine="xlsxwriter") as writer:
+        pd.DataFrame(list(params.items()), columns=["Parameter", "Value"]).to_excel(
+            writer, sheet_name="TrainingParams", index=False)
+
+    expected_ws = load_workbook(expected_output)["TrainingParams"]
+    ws = load_workbook(output)["TrainingParams"]
+    assert [[c.value for c in row] for row in ws.iter_rows()] == \
+        [[c.value for c in row] for row in expected_ws.iter_rows()]
+    assert ws["A1"].font.b
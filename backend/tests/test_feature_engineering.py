@@ -0,0 +1,94 @@
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.app.src.features import feature_engineering
+
+
+@pytest.fixture
+def df_with_gaps():
+    return pd.DataFrame({
+        "shop": ["a", "a", "a", "b", "b", "b"],
+        "value": [1.0, np.nan, 3.0, 10.0, np.nan, 30.0],
+        "clean": [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+    })
+
+# --- fill_missing_values ---
+def test_fill_missing_values_clean_frame_returned_as_is():
+    df = pd.DataFrame({"shop": ["b", "a"], "value": [1.0, 2.0]})
+    result = feature_engineering.fill_missing_values(df, "Forward fill", ["shop"])
+    # Без пропусков функция не должна сортировать и копировать датафрейм
+    assert result is df
+
+
+def test_fill_missing_values_group_mean(df_with_gaps):
+    result = feature_engineering.fill_missing_values(df_with_gaps, "Group mean")
+    assert result.loc[1, "value"] == pytest.approx(11.0)
+    assert result.loc[4, "value"] == pytest.approx(11.0)
+    assert result["clean"].tolist() == [1.0, 2.0, 3.0, 4.0, 5.0, 6.0]
+
+
+def test_fill_missing_values_group_mean_by_group(df_with_gaps):
+    df_with_gaps.loc[5, "value"] = np.nan
+    df_with_gaps.loc[3, "value"] = np.nan
+    df_with_gaps.loc[4, "value"] = np.nan
+    result = feature_engineering.fill_missing_values(df_with_gaps, "Group mean", ["shop"])
+    assert result.loc[1, "value"] == pytest.approx(2.0)
+    # В группе без значений пропуски остаются, как и в pandas groupby().mean()
+    assert result.loc[[3, 4, 5], "value"].isna().all()
+
+
+@pytest.mark.parametrize("use_numba", [True, False])
+def test_fill_missing_values_group_mean_nan_group_keys(monkeypatch, use_numba):
+    if use_numba and not feature_engineering.NUMBA_AVAILABLE:
+        pytest.skip("numba не установлен")
+    monkeypatch.setattr(feature_engineering, "NUMBA_AVAILABLE", use_numba)
+    df = pd.DataFrame({
+        "shop": ["a", None, "a", None],
+        "value": [1.0, np.nan, np.nan, 7.0],
+    })
+    result = feature_engineering.fill_missing_values(df, "Group mean", ["shop"])
+    assert result.loc[2, "value"] == pytest.approx(1.0)
+    # Строки без ключа группы, как в groupby().transform, становятся NaN — с numba и без
+    assert result.loc[[1, 3], "value"].isna().all()
+
+
+def test_fill_missing_values_forward_fill_by_group():
+    df = pd.DataFrame({
+        "shop": ["b", "a", "b", "a", "b"],
+        "value": [np.nan, 1.0, 5.0, np.nan, np.nan],
+    })
+    result = feature_engineering.fill_missing_values(df, "Forward fill", ["shop"])
+    # Значения не переносятся между группами: в начале группы работает bfill
+    assert result.loc[[1, 3], "value"].tolist() == [1.0, 1.0]
+    assert result.loc[[0, 2, 4], "value"].tolist() == [5.0, 5.0, 5.0]
+
+
+@pytest.mark.parametrize("use_numba", [True, False])
+def test_fill_missing_values_forward_fill_nan_group_keys(monkeypatch, use_numba):
+    if use_numba and not feature_engineering.NUMBA_AVAILABLE:
+        pytest.skip("numba не установлен")
+    monkeypatch.setattr(feature_engineering, "NUMBA_AVAILABLE", use_numba)
+    df = pd.DataFrame({
+        "shop": [None, "a", None, "a"],
+        "value": [np.nan, 2.0, 4.0, np.nan],
+    })
+    result = feature_engineering.fill_missing_values(df, "Forward fill", ["shop"])
+    assert result.loc[3, "value"] == 2.0
+    assert result.loc[[0, 2], "value"].isna().all()
+
+
+def test_fill_missing_values_constant(df_with_gaps):
+    result = feature_engineering.fill_missing_values(df_with_gaps, "Constant=0")
+    assert not result["value"].isna().any()
+    assert result.loc[1, "value"] == 0
+
+
+# --- add_russian_holiday_feature ---
+def test_add_russian_holiday_feature_marks_whole_day():
+    df = pd.DataFrame({"ts": pd.to_datetime(["2023-12-31 12:00", "2024-01-01 00:00", "2024-01-01 18:00"])})
+    result = feature_engineering.add_russian_holiday_feature(df, date_col="ts")
+    assert result["russian_holiday"].tolist() == [0.0, 1.0, 1.0]
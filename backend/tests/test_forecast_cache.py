@@ -0,0 +1,76 @@
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+# Модули приложения импортируют друг друга как AutoML..., src..., sessions...
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("autogluon.timeseries")
+
+from AutoML import autogluon_strategy
+
+
+class _CountingPredictor:
+    def __init__(self):
+        self.calls = 0
+
+    def predict(self, ts_df, known_covariates=None):
+        self.calls += 1
+        return pd.DataFrame({"mean": [float(self.calls)] * len(ts_df)}, index=ts_df.index)
+
+
+def _model_dir(tmp_path, name):
+    model_path = tmp_path / name
+    model_path.mkdir()
+    (model_path / "predictor.pkl").write_bytes(b"model")
+    return str(model_path)
+
+
+def _frame(values):
+    return pd.DataFrame({"target": values}, index=pd.RangeIndex(len(values)))
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(autogluon_strategy, "_forecast_cache", autogluon_strategy.OrderedDict())
+    monkeypatch.setattr(autogluon_strategy, "_forecast_cache_bytes", 0)
+
+
+# --- cached_forecast ---
+def test_cached_forecast_hits_for_same_model_and_equal_data(tmp_path):
+    model_path = _model_dir(tmp_path, "m")
+    predictor = _CountingPredictor()
+    first = autogluon_strategy.cached_forecast(model_path, predictor, _frame([1.0, 2.0]))
+    # Другой объект с теми же данными — тоже попадание
+    second = autogluon_strategy.cached_forecast(model_path, predictor, _frame([1.0, 2.0]))
+    assert predictor.calls == 1
+    pd.testing.assert_frame_equal(first, second)
+    assert first is not second
+
+
+def test_cached_forecast_invalidates_on_retrain_and_new_data(tmp_path):
+    model_path = _model_dir(tmp_path, "m")
+    predictor = _CountingPredictor()
+    autogluon_strategy.cached_forecast(model_path, predictor, _frame([1.0, 2.0]))
+    autogluon_strategy.cached_forecast(model_path, predictor, _frame([1.0, 3.0]))
+    assert predictor.calls == 2
+
+    pkl = os.path.join(model_path, "predictor.pkl")
+    os.utime(pkl, ns=(os.stat(pkl).st_atime_ns, os.stat(pkl).st_mtime_ns + 1_000_000))
+    autogluon_strategy.cached_forecast(model_path, predictor, _frame([1.0, 2.0]))
+    assert predictor.calls == 3
+    # Прогнозы прежней версии модели вытеснены
+    assert len(autogluon_strategy._forecast_cache) == 1
+
+
+def test_cached_forecast_evicts_least_recently_used(tmp_path, monkeypatch):
+    monkeypatch.setattr(autogluon_strategy, "_FORECAST_CACHE_MAX_ITEMS", 1)
+    predictor = _CountingPredictor()
+    first_model, second_model = _model_dir(tmp_path, "a"), _model_dir(tmp_path, "b")
+    autogluon_strategy.cached_forecast(first_model, predictor, _frame([1.0]))
+    autogluon_strategy.cached_forecast(second_model, predictor, _frame([1.0]))
+    autogluon_strategy.cached_forecast(first_model, predictor, _frame([1.0]))
+    assert predictor.calls == 3
+    assert autogluon_strategy._forecast_cache_bytes == sum(
+        nbytes for _, nbytes in autogluon_strategy._forecast_cache.values())
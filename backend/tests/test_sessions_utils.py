@@ -0,0 +1,28 @@
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+import stat
+
+from backend.app.sessions.utils import load_json_file, save_json_file
+
+
+# --- save_json_file ---
+def test_save_json_file_replaces_file_with_open_permissions(tmp_path):
+    path = tmp_path / "metadata.json"
+    reference = tmp_path / "reference.json"
+    with open(reference, "w") as f:
+        f.write("{}")
+    with open(path, "w") as f:
+        f.write('{"status": "initializing"}')
+
+    save_json_file(str(path), {"status": "completed", "progress": 100})
+
+    assert load_json_file(str(path)) == {"status": "completed", "progress": 100}
+    # Права как у файла, созданного open(), и никаких временных файлов рядом
+    assert stat.S_IMODE(os.stat(path).st_mode) == stat.S_IMODE(os.stat(reference).st_mode)
+    assert sorted(os.listdir(tmp_path)) == ["metadata.json", "reference.json"]
+
+
+# --- load_json_file ---
+def test_load_json_file_missing_returns_empty_dict(tmp_path):
+    assert load_json_file(str(tmp_path / "missing.json")) == {}